@@ -0,0 +1,223 @@
+##############################################################################
+# batchrender.py
+##############################################################################
+# Renders frames of the game offscreen and writes them out as image files
+# or raw RGB buffers.  Used to check that rendering changes leave the
+# output pixel for pixel the same and to time rendering on its own, with
+# no window or compositor involved.
+#
+# Input comes from a recorded session (see hash.py --record) or, without
+# one, the game runs with no input.  Encoding and writing the frames is
+# spread over a pool of processes.
+##############################################################################
+# 10/26 - GoshDarnGames
+##############################################################################
+
+import os
+import argparse
+import multiprocessing
+from timeit import default_timer
+
+#the dummy driver has to be selected before pygame starts
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+import pygame
+
+from lib.engine.systemevents import *
+from lib.engine.rendertarget import SurfaceTarget
+from lib.gameoverstate import GameOverState
+from lib.highscorestate import HighScoreState
+
+import hash as game
+from hash import GameEngine, GAME_NAME, SCREEN_SIZE, parse_size, parse_seed
+
+##############################################################################
+# CONSTANTS
+##############################################################################
+
+DEFAULT_FRAMES = 600
+
+STATES = ("game","highscore","gameover")
+
+#frames waiting to be written per process before rendering waits for them
+MAX_PENDING_PER_PROCESS = 4
+
+##############################################################################
+# FRAME WRITER
+##############################################################################
+
+def write_frame(path,size,data,raw):
+   """
+   Writes one frame of RGB data to path.  Runs in the process pool.
+   """
+   
+   if raw:
+      frame_file = open(path,"wb")
+      try:
+         frame_file.write(data)
+      finally:
+         frame_file.close()
+   else:
+      pygame.image.save(pygame.image.fromstring(data,size,"RGB"),path)
+
+##############################################################################
+# FRAME CAPTURE
+##############################################################################
+
+class FrameCapture(SystemEventListener):
+   """
+   Copies the render target after each render and hands it to the process
+   pool to be written.  Ends the game after a set number of frames.  Must
+   be created after the view so that it sees each frame once it is drawn.
+   """
+   
+   def __init__(self,target,pool,processes,output_dir,max_frames,raw):
+      """
+      target - render target the view draws on
+      pool - multiprocessing pool the frames are written by
+      processes - number of processes in the pool
+      output_dir - directory the frames are written to
+      max_frames - number of frames to capture
+      raw - if True frames are written as raw RGB, otherwise as PNG
+      """
+      
+      SystemEventListener.__init__(self,(RenderEvent,))
+      
+      self.target = target
+      self.pool = pool
+      self.output_dir = output_dir
+      self.max_frames = max_frames
+      self.raw = raw
+      
+      self.max_pending = processes * MAX_PENDING_PER_PROCESS
+      
+      self.frames = 0
+      
+      #results of frames the pool hasn't finished writing, oldest first
+      self.pending = []
+   
+   #--------------------------------------------------------------------------
+   
+   def notify(self,event):
+      
+      if isinstance(event,RenderEvent) and self.frames < self.max_frames:
+         
+         surface = self.target.surface
+         data = pygame.image.tostring(surface,"RGB")
+         
+         extension = "png"
+         if self.raw:
+            extension = "rgb"
+         
+         path = os.path.join(self.output_dir,"frame_%05d.%s" %
+                             (self.frames,extension))
+         
+         #don't let frames pile up faster than they can be written
+         if len(self.pending) >= self.max_pending:
+            self.pending.pop(0).get()
+         
+         self.pending.append(self.pool.apply_async(write_frame,
+                              (path,surface.get_size(),data,self.raw)))
+         
+         self.frames += 1
+         
+         if self.frames >= self.max_frames:
+            SystemEventManager.post(QuitEvent())
+   
+   #--------------------------------------------------------------------------
+   
+   def finish(self):
+      """
+      Waits for every frame to be written, raising any error a worker hit.
+      """
+      
+      while len(self.pending) > 0:
+         self.pending.pop(0).get()
+
+##############################################################################
+# MAIN EXECUTION
+##############################################################################
+
+if __name__ == "__main__":
+   
+   parser = argparse.ArgumentParser(description=GAME_NAME+" (batch render)")
+   parser.add_argument("output",metavar="DIR",
+                       help="directory to write the frames to")
+   parser.add_argument("--frames",type=int,default=DEFAULT_FRAMES,
+                       help="frames to render (default %(default)s)")
+   parser.add_argument("--state",choices=STATES,default="game",
+                       help="state to start in (default %(default)s)")
+   parser.add_argument("--score",type=int,
+                       help="score shown by the highscore and gameover "
+                            "states (default: one more than the high score)")
+   parser.add_argument("--replay",metavar="FILE",
+                       help="play back a recorded session as input")
+   parser.add_argument("--seed",type=parse_seed,default=0,
+                       help="random seed (default %(default)s)")
+   parser.add_argument("--raw",action="store_true",
+                       help="write raw RGB buffers instead of PNG files")
+   parser.add_argument("--full-redraw",action="store_true",
+                       help="redraw the whole screen every frame")
+   parser.add_argument("--render-size",metavar="WxH",type=parse_size,
+                       help="draw the game at this size and scale it to "
+                            "the frame size")
+   parser.add_argument("--processes",type=int,
+                       default=multiprocessing.cpu_count(),
+                       help="processes writing frames (default %(default)s)")
+   parser.add_argument("--telemetry",metavar="FILE",
+                       help="write frame timings to FILE (.json or .csv)")
+   args = parser.parse_args()
+   
+   if not os.path.isdir(args.output):
+      os.makedirs(args.output)
+   
+   #start the workers before pygame so they don't inherit it running
+   pool = multiprocessing.Pool(args.processes)
+   
+   game.DIRTY_RECT_RENDERING = not args.full_redraw
+   
+   pygame.init()
+   target = SurfaceTarget(SCREEN_SIZE)
+   
+   gameEngine = GameEngine(replay_path=args.replay,seed=args.seed,
+                           telemetry_path=args.telemetry,
+                           render_target=target,
+                           render_size=args.render_size)
+   
+   model = gameEngine.model
+   
+   if args.state != "game":
+      
+      #the high score state reads the current high score
+      high_score_state = HighScoreState(model,0)
+      old_high_score = high_score_state.old_high_score
+      
+      score = args.score
+      if score is None:
+         score = int(old_high_score[1]) + 1
+      
+      if args.state == "highscore":
+         high_score_state.new_score = score
+         model.change_state(high_score_state)
+      else:
+         model.change_state(GameOverState(model,("",score),old_high_score))
+         
+      #states listen for events until they are freed
+      del high_score_state
+   
+   frame_capture = FrameCapture(target,pool,args.processes,args.output,
+                                args.frames,args.raw)
+   
+   start = default_timer()
+   gameEngine.start()
+   elapsed = default_timer() - start
+   
+   frame_capture.finish()
+   pool.close()
+   pool.join()
+   
+   pygame.quit()
+   
+   print "frames: %d  drawn: %d  seconds: %.2f  frames/s: %.0f" % \
+         (frame_capture.frames,target.frames,elapsed,
+          frame_capture.frames/max(elapsed,1e-9))
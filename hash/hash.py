@@ -6,13 +6,26 @@
 # 03/13 - GoshDarnGames
 ##############################################################################
 
+import os
+import time
+import random
+import atexit
+import argparse
 import pygame
 
+from lib.engine.events import EventManager
+from lib.engine.eventprofiler import EventProfiler
+from lib.engine.frametelemetry import FrameTelemetry
+from lib.engine.fontcache import FONT_CACHE
 from lib.engine.systemevents import SystemEventManager
+from lib.gui import GUIEventManager
 
 #controllers
 from lib.engine.cpuspinner import CPUSpinner
+from lib.engine.cooperativespinner import CooperativeSpinner
 from lib.engine.pygameeventsmanager import PygameEventsManager
+from lib.engine.eventrecorder import EventRecorder, EventPlayer
+from lib.engine.eventrecorder import MIN_SEED, MAX_SEED
 
 #model
 from lib.engine.model import Model
@@ -21,7 +34,7 @@ from lib.engine.model import Model
 from lib.engine.pygameview import PygameView
 
 #initial state
-from lib.gamestate import GameState
+from lib.gamestate import GameState, GameEventManager
 from lib.highscorestate import HighScoreState
 
 ##############################################################################
@@ -33,28 +46,147 @@ FPS = 60
 SCREEN_SIZE = (640,480)
 BG_COLOR = (0,0,0)
 
+#size the game is drawn at before being scaled to the window.  A smaller
+#size is quicker to draw on slow machines.
+RENDER_SIZE = SCREEN_SIZE
+
+#queue events and dispatch them once per tick instead of as they are posted
+DEFERRED_EVENTS = False
+
+#set this environment variable to profile event dispatch, the results are
+#printed when the game exits along with the font cache statistics
+PROFILE_EVENTS_VAR = "HASH_PROFILE_EVENTS"
+
+#pace frames with the cooperative spinner so background tasks can be run
+#between frames (see GameEngine.add_task)
+COOPERATIVE_SPINNER = False
+
+#only redraw and update the parts of the screen that change each frame
+DIRTY_RECT_RENDERING = True
+
+#set this environment variable to report surfaces that are drawn without
+#being converted to the display format
+CHECK_SURFACES_VAR = "HASH_CHECK_SURFACES"
+
 ##############################################################################
 # GAME ENGINE CLASS
 ##############################################################################
 
 class GameEngine:
    
-   def __init__(self):
+   def __init__(self,record_path=None,replay_path=None,seed=None,
+                headless=False,telemetry_path=None,render_target=None,
+                render_size=None):
+      """
+      record_path - if given, the system event stream is recorded here
+      replay_path - if given, input is played back from this recording as
+                    fast as possible instead of read from pygame
+      seed - random seed for the session.  Replays use the recorded seed
+             and a seed is picked from the clock if none is given.
+      headless - if True nothing is drawn and ticks run as fast as
+                 possible.  The caller should select the dummy SDL video
+                 driver before creating the engine.
+      telemetry_path - if given, frame timings are collected and exported
+                       here (as CSV for a .csv file, JSON otherwise) when
+                       the game ends
+      render_target - if given, frames are drawn on this render target
+                      (see lib/engine/rendertarget.py) instead of in a
+                      window, as fast as possible
+      render_size - (width, height) the game is drawn at, defaults to
+                    RENDER_SIZE.  Frames are scaled to the window.
+      """
       
       #initialise pygame environment
       pygame.init()
       
+      #switch the event managers to queued dispatch if requested
+      if DEFERRED_EVENTS:
+         for event_manager in (SystemEventManager,GUIEventManager,
+                               GameEventManager):
+            event_manager.set_deferred(True)
+            
+      #time every listener if profiling was requested
+      if os.environ.get(PROFILE_EVENTS_VAR):
+         EventManager.profiler = EventProfiler()
+         atexit.register(EventManager.profiler.report)
+         atexit.register(FONT_CACHE.report)
+      
+      if render_size is None:
+         render_size = RENDER_SIZE
+         
+      #mouse positions are recorded in window pixels and given to the game
+      #in render size pixels
+      pos_scale = None
+      if tuple(render_size) != SCREEN_SIZE:
+         pos_scale = (float(render_size[0]) / SCREEN_SIZE[0],
+                      float(render_size[1]) / SCREEN_SIZE[1])
+      
+      #open the replay first as it holds the seed
+      self.event_player = None
+      if replay_path is not None:
+         self.event_player = EventPlayer(replay_path,pos_scale)
+         seed = self.event_player.seed
+      
+      if seed is None:
+         seed = int(time.time()*1000)
+      
+      random.seed(seed)
+      
+      #the recorder has to see each tick before the input for that tick
+      self.event_recorder = None
+      if record_path is not None:
+         self.event_recorder = EventRecorder(record_path,seed)
+      
       #create controllers
-      self.cpu_spinner = CPUSpinner(FPS)
-      self.pygame_events_manager = PygameEventsManager()
+      fps = FPS
       
-      #create model
-      self.model = Model(SCREEN_SIZE)
+      #replays, headless and offscreen runs are unthrottled
+      if self.event_player is not None or headless or \
+         render_target is not None:
+         fps = 0
+      
+      if COOPERATIVE_SPINNER:
+         self.cpu_spinner = CooperativeSpinner(fps)
+      else:
+         self.cpu_spinner = CPUSpinner(fps)
+         
+      if self.event_player is None:
+         self.pygame_events_manager = PygameEventsManager(pos_scale=pos_scale)
+         
+      #measure input, update and render time for each frame
+      self.telemetry_path = telemetry_path
+      self.telemetry = None
+      if telemetry_path is not None:
+         self.telemetry = FrameTelemetry(FPS)
+         self.cpu_spinner.telemetry = self.telemetry
+         
+         if self.event_player is None:
+            self.pygame_events_manager.telemetry = self.telemetry
+         else:
+            self.event_player.telemetry = self.telemetry
+      
+      #create views first so that the display exists and surfaces created
+      #by the model can be converted to its format
+      self.pygame_view = None
+      if not headless:
+         self.pygame_view = PygameView(GAME_NAME, SCREEN_SIZE, BG_COLOR,
+                                       DIRTY_RECT_RENDERING,
+                                       bool(os.environ.get(CHECK_SURFACES_VAR)),
+                                       render_target,render_size)
+      
+      #create model, it is laid out for the size it is drawn at
+      self.model = Model(render_size)
       self.model.change_state(GameState(self.model))
       
-      #create views
-      self.pygame_view = PygameView(GAME_NAME, SCREEN_SIZE, BG_COLOR)
       
+   #--------------------------------------------------------------------------
+      
+   def add_task(self,task):
+      """
+      Runs a generator in the time between frames.  Requires the
+      cooperative spinner.
+      """
+      self.cpu_spinner.add_task(task)
       
    #--------------------------------------------------------------------------
       
@@ -63,12 +195,74 @@ class GameEngine:
       #start the cpu spinner
       self.cpu_spinner.run()
       
+      if self.event_recorder is not None:
+         self.event_recorder.close()
+         
+      if self.telemetry is not None:
+         self.telemetry.export(self.telemetry_path)
+      
+   
+   
+##############################################################################
+# COMMAND LINE
+##############################################################################
+
+def parse_size(text):
+   """
+   Converts a WIDTHxHEIGHT command line argument to a (width, height) tuple.
+   """
    
+   try:
+      width,height = [int(value) for value in text.lower().split("x")]
+   except ValueError:
+      raise argparse.ArgumentTypeError("expected WIDTHxHEIGHT, got %r" % text)
+      
+   if width <= 0 or height <= 0:
+      raise argparse.ArgumentTypeError("size must be positive, got %r" % text)
+      
+   return (width,height)
+
+#-----------------------------------------------------------------------------
+
+def parse_seed(text):
+   """
+   Converts a random seed command line argument to an integer, checking it
+   can be stored in a recording.
+   """
    
+   try:
+      seed = int(text)
+   except ValueError:
+      raise argparse.ArgumentTypeError("expected an integer, got %r" % text)
+      
+   if not MIN_SEED <= seed <= MAX_SEED:
+      raise argparse.ArgumentTypeError("seed must be between %d and %d, "
+                                       "got %r" % (MIN_SEED,MAX_SEED,text))
+      
+   return seed
+
 ##############################################################################
 # MAIN EXECUTION
 ##############################################################################
 
-gameEngine = GameEngine()
-gameEngine.start()
-pygame.quit()
\ No newline at end of file
+if __name__ == "__main__":
+   
+   parser = argparse.ArgumentParser(description=GAME_NAME)
+   parser.add_argument("--record",metavar="FILE",
+                       help="record the session's input to FILE")
+   parser.add_argument("--replay",metavar="FILE",
+                       help="play back a recorded session as fast as possible")
+   parser.add_argument("--seed",type=parse_seed,
+                       help="random seed (ignored when replaying)")
+   parser.add_argument("--telemetry",metavar="FILE",
+                       help="write frame timings to FILE (.json or .csv)")
+   parser.add_argument("--render-size",metavar="WxH",type=parse_size,
+                       help="draw the game at this size and scale it to "
+                            "the window (default %dx%d)" % RENDER_SIZE)
+   args = parser.parse_args()
+   
+   gameEngine = GameEngine(args.record,args.replay,args.seed,
+                           telemetry_path=args.telemetry,
+                           render_size=args.render_size)
+   gameEngine.start()
+   pygame.quit()
\ No newline at end of file
@@ -0,0 +1,88 @@
+##############################################################################
+# headless.py
+##############################################################################
+# Runs the game without a display, as fast as the CPU allows.  Used on
+# machines with no screen and to measure simulation throughput in ticks
+# per second without any drawing cost.
+##############################################################################
+# 10/26 - GoshDarnGames
+##############################################################################
+
+import os
+import argparse
+from timeit import default_timer
+
+#the dummy driver has to be selected before pygame starts
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+import pygame
+
+from lib.engine.systemevents import *
+
+from hash import GameEngine, GAME_NAME, parse_seed
+
+##############################################################################
+# CONSTANTS
+##############################################################################
+
+DEFAULT_TICKS = 36000
+
+##############################################################################
+# TICK COUNTER
+##############################################################################
+
+class TickCounter(SystemEventListener):
+   """
+   Counts ticks and ends the game after a set number of them.
+   """
+   
+   def __init__(self,max_ticks):
+      """
+      max_ticks - number of ticks to run for, None to run until quit
+      """
+      
+      SystemEventListener.__init__(self,(TickEvent,))
+      
+      self.max_ticks = max_ticks
+      self.ticks = 0
+   
+   #--------------------------------------------------------------------------
+   
+   def notify(self,event):
+      
+      if isinstance(event,TickEvent):
+         self.ticks += 1
+         
+         if self.max_ticks is not None and self.ticks >= self.max_ticks:
+            SystemEventManager.post(QuitEvent())
+
+##############################################################################
+# MAIN EXECUTION
+##############################################################################
+
+if __name__ == "__main__":
+   
+   parser = argparse.ArgumentParser(description=GAME_NAME+" (headless)")
+   parser.add_argument("--ticks",type=int,default=DEFAULT_TICKS,
+                       help="ticks to run for, 0 to run until the game quits"
+                            " (default %(default)s)")
+   parser.add_argument("--replay",metavar="FILE",
+                       help="play back a recorded session")
+   parser.add_argument("--seed",type=parse_seed,help="random seed")
+   parser.add_argument("--telemetry",metavar="FILE",
+                       help="write frame timings to FILE (.json or .csv)")
+   args = parser.parse_args()
+   
+   tick_counter = TickCounter(args.ticks or None)
+   
+   gameEngine = GameEngine(replay_path=args.replay,seed=args.seed,
+                           headless=True,telemetry_path=args.telemetry)
+   
+   start = default_timer()
+   gameEngine.start()
+   elapsed = default_timer() - start
+   
+   pygame.quit()
+   
+   print "ticks: %d  seconds: %.2f  ticks/s: %.0f" % \
+         (tick_counter.ticks,elapsed,tick_counter.ticks/max(elapsed,1e-9))
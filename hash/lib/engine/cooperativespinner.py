@@ -0,0 +1,115 @@
+##############################################################################
+# cooperativespinner.py
+##############################################################################
+# A CPU spinner that shares the time between frames with background tasks.
+#
+# Tasks are generators.  Each time a task yields it gives control back to
+# the spinner, which resumes it later when there is time to spare before
+# the next frame.  A task that yields a number of seconds is not resumed
+# until at least that long has passed.
+##############################################################################
+# 10/26 - GoshDarnGames
+##############################################################################
+
+import time
+import traceback
+from timeit import default_timer
+
+from cpuspinner import *
+
+class CooperativeSpinner(CPUSpinner):
+
+   def __init__(self,fps):
+   
+      CPUSpinner.__init__(self,fps)
+      
+      #background tasks as [time the task may next run, generator]
+      self.tasks = []
+      
+   #--------------------------------------------------------------------------
+   
+   def add_task(self,task):
+      """
+      Schedules a generator to run between frames, starting as soon as
+      there is time.
+      """
+      self.tasks.append([0,task])
+      
+   #--------------------------------------------------------------------------
+      
+   def run(self):
+   
+      CPUSpinner.run(self)
+            
+      #give unfinished tasks a chance to clean up
+      for wake_time,task in self.tasks:
+         task.close()
+         
+      self.tasks = []
+            
+   #--------------------------------------------------------------------------
+   
+   def _wait(self,deadline):
+      """
+      Spends the time until the next tick on background tasks.
+      """
+      
+      self._run_tasks(deadline)
+      CPUSpinner._wait(self,deadline)
+      
+   #--------------------------------------------------------------------------
+   
+   def _wait_for_input(self,timeout):
+      """
+      Blocking on input would starve background tasks, so the loop only
+      idles once there are none left.
+      """
+      
+      if len(self.tasks) == 0:
+         CPUSpinner._wait_for_input(self,timeout)
+      
+   #--------------------------------------------------------------------------
+   
+   def _run_tasks(self,deadline):
+      """
+      Steps ready tasks in turn until the deadline for the next frame is
+      reached or every task has finished or is waiting past the deadline.
+      """
+      
+      while self.running and self.tasks:
+      
+         now = default_timer()
+         
+         if now >= deadline:
+            return
+            
+         ready = [entry for entry in self.tasks if entry[0] <= now]
+         
+         #nothing to do yet, so sleep until the first task wakes
+         if len(ready) == 0:
+         
+            wake_time = min(entry[0] for entry in self.tasks)
+            
+            if wake_time >= deadline:
+               return
+               
+            time.sleep(wake_time - now)
+            continue
+         
+         for entry in ready:
+         
+            if default_timer() >= deadline:
+               return
+               
+            try:
+               delay = next(entry[1])
+            except StopIteration:
+               self.tasks.remove(entry)
+               continue
+            except Exception:
+               #a broken task shouldn't take the game down with it
+               traceback.print_exc()
+               self.tasks.remove(entry)
+               continue
+               
+            entry[0] = default_timer() + (delay or 0)
@@ -1,40 +1,208 @@
 ##############################################################################
 # cpuspinner.py
 ##############################################################################
-# Class used to keep the game looping.  Generates a tick event each time
-# the game loops.
+# Class used to keep the game looping.  Generates a tick event at a fixed
+# rate and a render event whenever there is time to draw.
 ##############################################################################
 # 06/12 - GoshDarnGames
 ##############################################################################
 
-from systemevents import *
+import time
+from timeit import default_timer
+
 import pygame
+from systemevents import *
+
+##############################################################################
+# CONSTANTS
+##############################################################################
+
+#most ticks run back to back before a frame is rendered when the game is
+#running behind
+MAX_FRAME_SKIP = 5
+
+#most real time in seconds owed to the simulation at once, anything beyond
+#it after a stall (window drag, debugger pause, suspend) is dropped rather
+#than caught up with
+MAX_CATCH_UP = 0.25
+
+#pygame event used to end an idle wait when its timeout runs out
+WAKE_EVENT = pygame.USEREVENT
+   
+##############################################################################
+# CPU SPINNER
+##############################################################################
    
 class CPUSpinner(SystemEventListener):
+   """
+   Runs the game simulation at a fixed number of ticks per second,
+   independent of how quickly frames can be drawn.  Real time is collected
+   in an accumulator and spent on ticks; a render event follows each batch
+   of ticks.  When drawing is slow, render frames are skipped so that the
+   simulation keeps up, but ticks are never dropped unless the loop has
+   stalled for longer than max_catch_up.
+   
+   If the last tick before a render posted an IdleEvent, the spinner sleeps
+   on the pygame event queue after rendering until input arrives or the
+   idle timeout runs out.  Idling only happens when ticks are throttled.
+   """
 
-   def __init__(self,fps):
+   def __init__(self,fps,max_frame_skip=MAX_FRAME_SKIP,
+                max_catch_up=MAX_CATCH_UP):
+      """
+      fps - ticks per second.  0 runs ticks as fast as possible, rendering
+            after each one.
+      max_frame_skip - most ticks run before a frame must be rendered
+      max_catch_up - most seconds of ticks owed after a stall
+      """
    
-      SystemEventListener.__init__(self)
+      SystemEventListener.__init__(self,(QuitEvent,IdleEvent))
       
       #desired FPS
       self.fps = fps
       
+      self.max_frame_skip = max_frame_skip
+      self.max_catch_up = max_catch_up
+      
       #boolean to indicate whether we should keep running
       self.running = True
       
-      #clock used to maintain FPS
-      self.clock = pygame.time.Clock()
+      #set when the last tick asked for the loop to idle, and the longest
+      #it should sleep in seconds (None means until input)
+      self.idle = False
+      self.idle_timeout = None
+      
+      #FrameTelemetry to report tick and render times to, if any
+      self.telemetry = None
       
    #--------------------------------------------------------------------------
       
    def run(self):
+   
+      tick_time = 0
+      if self.fps > 0:
+         tick_time = 1.0 / self.fps
+      
+      #real time owed to the simulation
+      lag = 0.0
+      previous = default_timer()
+      
       while(self.running):
-         self.clock.tick(self.fps)
-         event = TickEvent()
-         SystemEventManager.post(event)
+      
+         now = default_timer()
+         lag += now - previous
+         previous = now
+         
+         #a stall shouldn't be replayed in full, running slowly only
+         #skips renders
+         lag = min(lag,self.max_catch_up)
+         
+         ticks = 0
+         
+         while self.running and lag >= tick_time:
+            self._tick()
+            lag -= tick_time
+            ticks += 1
+            
+            #keep the time owed and draw a frame before carrying on
+            if ticks >= self.max_frame_skip or tick_time == 0:
+               break
+               
+         if ticks > 0:
+            self._render()
+            
+            if self.idle and self.running and tick_time > 0:
+               self._wait_for_input(self.idle_timeout)
+               
+               #time spent idle isn't owed to the simulation, but tick
+               #straight away to handle whatever woke us
+               previous = default_timer()
+               lag = tick_time
+               
+         else:
+            self._wait(now + tick_time - lag)
+         
+   #--------------------------------------------------------------------------
+   
+   def _tick(self):
+      """
+      Posts a tick event and dispatches everything it causes.
+      """
+      
+      #listeners have to ask to idle again on every tick
+      self.idle = False
+      
+      if self.telemetry is not None:
+         start = default_timer()
+      
+      SystemEventManager.post(TICK_EVENT)
+      
+      #dispatch anything queued by managers using deferred dispatch
+      EventManager.drain_deferred()
+      
+      if self.telemetry is not None:
+         self.telemetry.add_tick(default_timer() - start)
+         
+   #--------------------------------------------------------------------------
+   
+   def _render(self):
+      """
+      Posts a render event so that views draw the current state.
+      """
+      
+      if self.telemetry is not None:
+         start = default_timer()
+         
+      SystemEventManager.post(RENDER_EVENT)
+      EventManager.drain_deferred()
+      
+      if self.telemetry is not None:
+         self.telemetry.end_frame(default_timer() - start)
+      
+      #a frame is the ticks run since the last render and this render
+      if EventManager.profiler is not None:
+         EventManager.profiler.end_frame()
+      
+   #--------------------------------------------------------------------------
+   
+   def _wait(self,deadline):
+      """
+      Called when there is nothing to do until deadline.
+      """
+      
+      remaining = deadline - default_timer()
+      
+      if remaining > 0:
+         time.sleep(remaining)
+         
+   #--------------------------------------------------------------------------
+   
+   def _wait_for_input(self,timeout):
+      """
+      Blocks until there is a pygame event to handle or timeout seconds
+      have passed.  The event is left on the queue to be read as normal.
+      """
+      
+      #the input stage may have blocked everything it doesn't convert
+      pygame.event.set_allowed((WAKE_EVENT,pygame.VIDEOEXPOSE))
+      
+      if timeout is not None:
+         pygame.time.set_timer(WAKE_EVENT,max(1,int(timeout*1000)))
+         
+      event = pygame.event.wait()
+      
+      if timeout is not None:
+         pygame.time.set_timer(WAKE_EVENT,0)
+         
+      if event.type != WAKE_EVENT:
+         pygame.event.post(event)
          
    #--------------------------------------------------------------------------
    
    def notify(self,event):
       if isinstance(event,QuitEvent):
-         self.running = False
\ No newline at end of file
+         self.running = False
+         
+      if isinstance(event,IdleEvent):
+         self.idle = True
+         self.idle_timeout = event.timeout
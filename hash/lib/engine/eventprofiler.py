@@ -0,0 +1,110 @@
+##############################################################################
+# eventprofiler.py
+##############################################################################
+# Optional instrumentation for the event managers.  Records how long each
+# kind of listener takes to handle each kind of event and how many events
+# are posted each frame.
+#
+# Install a profiler by assigning it to EventManager.profiler.
+##############################################################################
+# 10/26 - GoshDarnGames
+##############################################################################
+
+import sys
+from timeit import default_timer
+
+class EventProfiler:
+   """
+   Collects dispatch statistics keyed by (event class, listener class).
+   
+   Times are inclusive: if a listener posts further events while handling
+   one, the time spent dispatching those is counted against it as well.
+   """
+   
+   def __init__(self):
+      
+      #{ (event class name, listener class name) : [calls, total, max] }
+      self.stats = dict()
+      
+      #number of frames completed
+      self.frames = 0
+      
+      #events posted in the current frame
+      self.frame_posts = 0
+      
+      #events posted over all completed frames and the most in one frame
+      self.total_posts = 0
+      self.max_posts = 0
+   
+   #--------------------------------------------------------------------------
+   
+   def notify(self,listener,event):
+      """
+      Passes event on to listener and records how long it took.
+      """
+      
+      start = default_timer()
+      listener.notify(event)
+      elapsed = default_timer() - start
+      
+      key = (event.__class__.__name__,listener.__class__.__name__)
+      stat = self.stats.get(key)
+      
+      if stat is None:
+         self.stats[key] = [1,elapsed,elapsed]
+      else:
+         stat[0] += 1
+         stat[1] += elapsed
+         if elapsed > stat[2]:
+            stat[2] = elapsed
+   
+   #--------------------------------------------------------------------------
+   
+   def count_post(self):
+      """
+      Called by the event managers each time an event is posted.
+      """
+      self.frame_posts += 1
+   
+   #--------------------------------------------------------------------------
+   
+   def end_frame(self):
+      """
+      Called by the game loop after each render.  A frame is every tick
+      run since the last render and the render itself.
+      """
+      
+      self.frames += 1
+      self.total_posts += self.frame_posts
+      
+      if self.frame_posts > self.max_posts:
+         self.max_posts = self.frame_posts
+      
+      self.frame_posts = 0
+   
+   #--------------------------------------------------------------------------
+   
+   def report(self,stream=sys.stdout):
+      """
+      Writes a table of the statistics gathered so far to stream, slowest
+      (event, listener) pairs first.
+      """
+      
+      stream.write("EVENT DISPATCH PROFILE\n")
+      
+      if self.frames > 0:
+         stream.write("frames: %d  events/frame: mean %.1f max %d\n" %
+                      (self.frames,float(self.total_posts)/self.frames,
+                       self.max_posts))
+      
+      stream.write("%-22s %-22s %8s %10s %9s %9s\n" %
+                   ("event","listener","calls","total ms","mean ms",
+                    "max ms"))
+      
+      rows = sorted(self.stats.items(),key=lambda item: item[1][1],
+                    reverse=True)
+      
+      for (event_name,listener_name),(calls,total,longest) in rows:
+         stream.write("%-22s %-22s %8d %10.2f %9.4f %9.4f\n" %
+                      (event_name,listener_name,calls,total*1000.0,
+                       total*1000.0/calls,longest*1000.0))
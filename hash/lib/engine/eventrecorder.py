@@ -0,0 +1,273 @@
+##############################################################################
+# eventrecorder.py
+##############################################################################
+# Records the system event stream to a compact binary log and plays it
+# back.
+#
+# A log starts with a header holding the random seed the session used,
+# followed by one record per event.  Each record is a one byte tag, a one
+# byte payload length and the payload.  A tick record marks the start of
+# each frame and is followed by the input events posted during that frame.
+# Mouse positions are recorded in window pixels and scaled to the render
+# size on playback, so a log replays the same at any render size.
+##############################################################################
+# 10/26 - GoshDarnGames
+##############################################################################
+
+import struct
+import pygame
+from timeit import default_timer
+from systemevents import *
+from pygameeventsmanager import scale_pos
+
+##############################################################################
+# CONSTANTS
+##############################################################################
+
+LOG_MAGIC = "HASHREC"
+LOG_VERSION = 1
+
+#magic, version, random seed
+HEADER_FORMAT = struct.Struct("<7sBq")
+
+#range of seeds the header can hold
+MIN_SEED = -2**63
+MAX_SEED = 2**63 - 1
+
+#tag, payload length
+RECORD_FORMAT = struct.Struct("<BB")
+
+#record tags
+TICK_TAG = 0
+QUIT_TAG = 1
+KEYBOARD_TAG = 2
+MOUSE_BUTTON_TAG = 3
+MOUSE_MOTION_TAG = 4
+
+#payload formats for records that carry data
+KEYBOARD_FORMAT = struct.Struct("<HI")      #type, key
+MOUSE_BUTTON_FORMAT = struct.Struct("<HBhh") #type, button, pos
+MOUSE_MOTION_FORMAT = struct.Struct("<hhhhB") #pos, rel, buttons bitmask
+
+##############################################################################
+# EVENT RECORDER
+##############################################################################
+
+class EventRecorder(SystemEventListener):
+   """
+   Writes system events to a log file as they are posted.  The recorder
+   must be created before the object that converts pygame input into system
+   events so that it sees each tick before that frame's input.
+   """
+   
+   def __init__(self,path,seed):
+      """
+      path - file the log is written to
+      seed - random seed used by the session, stored in the header.  Must
+             be between MIN_SEED and MAX_SEED.
+      """
+      
+      if not MIN_SEED <= seed <= MAX_SEED:
+         raise ValueError("seed %d can't be stored in an event log" % seed)
+      
+      SystemEventListener.__init__(self,(TickEvent,QuitEvent,KeyboardEvent,
+                                         MouseButtonEvent,MouseMotionEvent))
+      
+      self.log_file = open(path,"wb")
+      self.log_file.write(HEADER_FORMAT.pack(LOG_MAGIC,LOG_VERSION,seed))
+   
+   #--------------------------------------------------------------------------
+   
+   def notify(self,event):
+      
+      if self.log_file is None:
+         return
+      
+      if isinstance(event,TickEvent):
+         self._write(TICK_TAG,"")
+      
+      elif isinstance(event,MouseMotionEvent):
+         
+         buttons = 0
+         for idx,pressed in enumerate(event.buttons):
+            if pressed:
+               buttons |= 1 << idx
+         
+         self._write(MOUSE_MOTION_TAG,
+                     MOUSE_MOTION_FORMAT.pack(event.window_pos[0],
+                                              event.window_pos[1],
+                                              event.window_rel[0],
+                                              event.window_rel[1],
+                                              buttons))
+      
+      elif isinstance(event,MouseButtonEvent):
+         self._write(MOUSE_BUTTON_TAG,
+                     MOUSE_BUTTON_FORMAT.pack(event.type,event.button,
+                                              event.window_pos[0],
+                                              event.window_pos[1]))
+      
+      elif isinstance(event,KeyboardEvent):
+         self._write(KEYBOARD_TAG,KEYBOARD_FORMAT.pack(event.type,event.key))
+      
+      elif isinstance(event,QuitEvent):
+         self._write(QUIT_TAG,"")
+         self.close()
+   
+   #--------------------------------------------------------------------------
+   
+   def close(self):
+      """
+      Flushes and closes the log.  Safe to call more than once.
+      """
+      
+      if self.log_file is not None:
+         self.log_file.close()
+         self.log_file = None
+   
+   #--------------------------------------------------------------------------
+   
+   def _write(self,tag,payload):
+      self.log_file.write(RECORD_FORMAT.pack(tag,len(payload)))
+      self.log_file.write(payload)
+
+##############################################################################
+# EVENT PLAYER
+##############################################################################
+
+class EventPlayer(SystemEventListener):
+   """
+   Replays a log written by the EventRecorder.  Takes the place of the
+   PygameEventsManager: on each tick it posts the input events recorded
+   for the next frame.  A QuitEvent is posted when the log runs out.
+   """
+   
+   def __init__(self,path,pos_scale=None):
+      """
+      path - log file to replay.  The seed it was recorded with is
+             available as the seed attribute.
+      pos_scale - (x, y) factors mapping the recorded window positions to
+                  the render size, as for the PygameEventsManager
+      """
+      
+      SystemEventListener.__init__(self,(TickEvent,))
+      
+      self.pos_scale = pos_scale
+      
+      self.log_file = open(path,"rb")
+      
+      header = self.log_file.read(HEADER_FORMAT.size)
+      
+      if len(header) < HEADER_FORMAT.size:
+         raise ValueError("%s is not an event log" % path)
+      
+      magic,version,self.seed = HEADER_FORMAT.unpack(header)
+      
+      if magic != LOG_MAGIC or version != LOG_VERSION:
+         raise ValueError("%s is not a version %d event log" %
+                          (path,LOG_VERSION))
+      
+      #number of frames played so far
+      self.frames = 0
+      
+      #record read ahead of the current frame as (tag, payload)
+      self._next_record = self._read()
+      
+      #FrameTelemetry to report input handling time to, if any
+      self.telemetry = None
+   
+   #--------------------------------------------------------------------------
+   
+   def notify(self,event):
+      
+      if isinstance(event,TickEvent):
+         
+         if self.telemetry is None:
+            self._play_frame()
+         else:
+            start = default_timer()
+            self._play_frame()
+            self.telemetry.add_input(default_timer() - start)
+   
+   #--------------------------------------------------------------------------
+   
+   def _play_frame(self):
+      """
+      Posts the input events recorded for the next frame.
+      """
+      
+      #keep the window responsive while input comes from the log
+      pygame.event.pump()
+      
+      #skip this frame's tick record
+      if self._next_record is not None and \
+         self._next_record[0] == TICK_TAG:
+         
+         self._next_record = self._read()
+         self.frames += 1
+      
+      #post everything up to the next frame
+      while self._next_record is not None and \
+            self._next_record[0] != TICK_TAG:
+         
+         tag,payload = self._next_record
+         self._next_record = self._read()
+         
+         event_to_post = self._decode(tag,payload)
+         
+         if event_to_post is not None:
+            SystemEventManager.post(event_to_post)
+      
+      if self._next_record is None:
+         self.log_file.close()
+         SystemEventManager.post(QuitEvent())
+   
+   #--------------------------------------------------------------------------
+   
+   def _read(self):
+      """
+      Returns the next (tag, payload) record or None at the end of the log.
+      """
+      
+      if self.log_file.closed:
+         return None
+      
+      record = self.log_file.read(RECORD_FORMAT.size)
+      
+      if len(record) < RECORD_FORMAT.size:
+         return None
+      
+      tag,length = RECORD_FORMAT.unpack(record)
+      payload = self.log_file.read(length)
+      
+      if len(payload) < length:
+         return None
+      
+      return (tag,payload)
+   
+   #--------------------------------------------------------------------------
+   
+   def _decode(self,tag,payload):
+      """
+      Converts a record back into a system event.  Unknown tags are skipped.
+      """
+      
+      if tag == MOUSE_MOTION_TAG:
+         x,y,rel_x,rel_y,buttons = MOUSE_MOTION_FORMAT.unpack(payload)
+         pressed = tuple((buttons >> idx) & 1 for idx in range(3))
+         return MouseMotionEvent(scale_pos((x,y),self.pos_scale),
+                                 scale_pos((rel_x,rel_y),self.pos_scale),
+                                 pressed,(x,y),(rel_x,rel_y))
+      
+      if tag == MOUSE_BUTTON_TAG:
+         type,button,x,y = MOUSE_BUTTON_FORMAT.unpack(payload)
+         return MouseButtonEvent(type,button,
+                                 scale_pos((x,y),self.pos_scale),(x,y))
+      
+      if tag == KEYBOARD_TAG:
+         type,key = KEYBOARD_FORMAT.unpack(payload)
+         return KeyboardEvent(type,key)
+      
+      if tag == QUIT_TAG:
+         return QuitEvent()
+      
+      return None
@@ -6,21 +6,46 @@
 # There is an interface for events and listeners.
 #
 # The EventManager class provides static methods for notifying listeners.
+# Managers can be switched to deferred dispatch, where posted events are
+# queued and dispatched in a batch when the game loop drains them.
 ##############################################################################
 # 03/13 - GoshDarnGames
 ##############################################################################
 
-from weakref import WeakKeyDictionary
+from collections import deque
+from weakref import WeakKeyDictionary, ref
 
 ##############################################################################
-# EVENT SUPERCLASS
+# CONSTANTS
+##############################################################################
+
+#number of times deferred events may post further events during one drain
+#before it is treated as a cycle
+MAX_DRAIN_DEPTH = 16
+
+##############################################################################
+# EXCEPTIONS
 ##############################################################################
 
-class Event:
+class EventCycleError(Exception):
    """
-   Superclass for all events.
+   Raised when draining deferred events is still producing new events after
+   the maximum drain depth, which usually means listeners are posting events
+   back and forth to each other.
    """
    pass
+
+##############################################################################
+# EVENT SUPERCLASS
+##############################################################################
+
+class Event(object):
+   """
+   Superclass for all events.  Events are posted many times a frame, so
+   subclasses should declare their attributes in __slots__ to keep them
+   small and cheap to create.
+   """
+   __slots__ = ()
    
 ##############################################################################
 # LISTENER SUPERCLASS
@@ -31,8 +56,13 @@ class Listener:
    Interface for listeners.                                                   
    """
    
-   def __init__(self,event_manager):
-      event_manager.register_listener(self)
+   def __init__(self,event_manager,event_types=(Event,)):
+      """
+      event_manager - the manager to register with
+      event_types - event classes this listener wants to be notified of.
+                    Subclasses of these classes are also delivered.
+      """
+      event_manager.register_listener(self,event_types)
    
    def notify(self,event):
       raise NotImplementedError
@@ -45,16 +75,49 @@ class EventManager:
    """
    Superclass for all event managers.  Keeps a list of listeners and 
    dispatches events to them.
+   
+   Listeners subscribe to event classes.  The listeners interested in each
+   event class are worked out the first time that class is posted and kept
+   in a dispatch table until the set of listeners changes, so posting an
+   event only calls the listeners that care about it.  Listeners are called
+   in the order they registered.
+   
+   By default events are dispatched as soon as they are posted.  After
+   set_deferred(True) a manager queues posted events instead and they are
+   dispatched by drain_deferred(), which the game loop calls once per tick.
    """
    
-   #keys of this map are objects listening for events
+   #keys of this map are objects listening for events.  Values are
+   #(registration number, event types) tuples.
    listeners = WeakKeyDictionary()
+   
+   #incremented on each registration to keep dispatch order stable
+   _registration_count = 0
+   
+   #events waiting to be dispatched, None when dispatch is immediate
+   _event_queue = None
+   
+   #managers with deferred dispatch switched on, drained in this order
+   _deferred_managers = []
+   
+   #true while drain_deferred is dispatching
+   _draining = False
+   
+   #managers to switch back to immediate dispatch when the running drain
+   #has finished
+   _switching_to_immediate = []
+   
+   #EventProfiler shared by all managers, None when not profiling
+   profiler = None
       
    #--------------------------------------------------------------------------
    
    @classmethod
-   def register_listener(cls,listener):
-      cls.listeners[listener] = 1
+   def register_listener(cls,listener,event_types=(Event,)):
+      EventManager._registration_count += 1
+      cls.listeners[listener] = (EventManager._registration_count,
+                                 tuple(event_types))
+      cls._dispatch_table = dict()
       
    #--------------------------------------------------------------------------
   
@@ -62,10 +125,169 @@ class EventManager:
    def unregister_listener(cls,listener):
       if listener in cls.listeners.keys():
          del cls.listeners[listener]
+         cls._dispatch_table = dict()
          
    #--------------------------------------------------------------------------
    
    @classmethod
    def post(cls,event):
-      for listener in cls.listeners.keys():
-         listener.notify(event)
\ No newline at end of file
+      if EventManager.profiler is not None:
+         EventManager.profiler.count_post()
+         
+      if cls._event_queue is not None:
+         cls._event_queue.append(event)
+      else:
+         cls._dispatch(event)
+         
+   #--------------------------------------------------------------------------
+   
+   @classmethod
+   def set_deferred(cls,deferred):
+      """
+      Switches between queued (deferred) and immediate dispatch for this
+      manager.  Any events still queued are dispatched when switching back
+      to immediate dispatch.
+      
+      Switching back while drain_deferred is running is put off until the
+      drain has finished, so the queued events are dispatched by its passes
+      and still count towards max_depth.
+      """
+      
+      switching = EventManager._switching_to_immediate
+      
+      if deferred:
+         if cls in switching:
+            switching.remove(cls)
+            
+         if cls._event_queue is None:
+            cls._event_queue = deque()
+            EventManager._deferred_managers.append(cls)
+         return
+         
+      if EventManager._draining:
+         if cls._event_queue is not None and cls not in switching:
+            switching.append(cls)
+         return
+         
+      if cls._event_queue is not None:
+         event_queue = cls._event_queue
+         cls._event_queue = None
+         EventManager._deferred_managers.remove(cls)
+         
+         while event_queue:
+            cls._dispatch(event_queue.popleft())
+            
+   #--------------------------------------------------------------------------
+   
+   @staticmethod
+   def drain_deferred(max_depth=MAX_DRAIN_DEPTH):
+      """
+      Dispatches the events queued on every deferred manager.
+      
+      The drain runs in passes.  Each pass dispatches the events that were
+      queued when it started, manager by manager in the order deferred
+      dispatch was switched on.  Events posted by listeners during a pass
+      are dispatched by the next one.  If events are still being posted
+      after max_depth passes an EventCycleError is raised.
+      
+      Calls made while a drain is already running return immediately.
+      Managers that asked to switch back to immediate dispatch during the
+      drain are switched once every queue is empty.
+      """
+      
+      if EventManager._draining:
+         return
+         
+      managers = EventManager._deferred_managers
+      EventManager._draining = True
+      
+      try:
+         depth = 0
+         
+         while True:
+            
+            pending = [len(manager._event_queue) for manager in managers]
+            
+            if not any(pending):
+               break
+               
+            if depth >= max_depth:
+               event_names = set()
+               for manager in managers:
+                  for event in manager._event_queue:
+                     event_names.add(event.__class__.__name__)
+                     
+               raise EventCycleError("events still posted after %d passes: %s"
+                                     % (depth, ", ".join(sorted(event_names))))
+               
+            for manager,count in zip(managers,pending):
+               event_queue = manager._event_queue
+               for i in range(count):
+                  manager._dispatch(event_queue.popleft())
+                  
+            depth += 1
+            
+      finally:
+         EventManager._draining = False
+         
+      switching = EventManager._switching_to_immediate
+      EventManager._switching_to_immediate = []
+      
+      for manager in switching:
+         manager.set_deferred(False)
+            
+   #--------------------------------------------------------------------------
+   
+   @classmethod
+   def _dispatch(cls,event):
+      """
+      Notifies the listeners interested in event.
+      """
+      
+      profiler = EventManager.profiler
+      
+      for listener_ref in cls._get_listeners(event.__class__):
+         listener = listener_ref()
+         
+         #listener may have been garbage collected since the table was built
+         if listener is None:
+            continue
+            
+         if profiler is None:
+            listener.notify(event)
+         else:
+            profiler.notify(listener,event)
+            
+   #--------------------------------------------------------------------------
+   
+   @classmethod
+   def _get_listeners(cls,event_class):
+      """
+      Returns a list of weak references to the listeners subscribed to
+      event_class or one of its superclasses, building the dispatch table
+      entry if needed.
+      """
+      
+      #each manager keeps its own table so look in the class dict only
+      dispatch_table = cls.__dict__.get("_dispatch_table")
+      
+      if dispatch_table is None:
+         dispatch_table = cls._dispatch_table = dict()
+      
+      listener_refs = dispatch_table.get(event_class)
+      
+      if listener_refs is None:
+      
+         interested = []
+         
+         for listener,(order,event_types) in cls.listeners.items():
+            for event_type in event_types:
+               if issubclass(event_class,event_type):
+                  interested.append((order,ref(listener)))
+                  break
+                  
+         interested.sort()
+         listener_refs = [listener_ref for order,listener_ref in interested]
+         dispatch_table[event_class] = listener_refs
+         
+      return listener_refs
\ No newline at end of file
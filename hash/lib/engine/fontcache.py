@@ -0,0 +1,80 @@
+##############################################################################
+# fontcache.py
+##############################################################################
+# Shared cache of pygame fonts.  Looking up a system font and building a
+# Font object is slow, so fonts are created once per (face, size, bold)
+# and reused.
+##############################################################################
+# 10/26 - GoshDarnGames
+##############################################################################
+
+import sys
+from collections import OrderedDict
+
+import pygame
+
+##############################################################################
+# CONSTANTS
+##############################################################################
+
+#most fonts kept before the least recently used one is dropped
+MAX_FONTS = 32
+
+##############################################################################
+# FONT CACHE
+##############################################################################
+
+class FontCache:
+   """
+   Least recently used cache of system fonts.  The hit and miss counters
+   show whether fonts are still being created once the game is running.
+   """
+   
+   def __init__(self,max_fonts=MAX_FONTS):
+   
+      self.max_fonts = max_fonts
+      
+      #{ (face, size, bold) : pygame.font.Font }, least recently used first
+      self.fonts = OrderedDict()
+      
+      self.hits = 0
+      self.misses = 0
+      
+   #--------------------------------------------------------------------------
+   
+   def get(self,face,size,bold=False):
+      """
+      Returns the system font matching face, size and bold, creating it if
+      it isn't cached.
+      """
+      
+      key = (face,size,bold)
+      font = self.fonts.pop(key,None)
+      
+      if font is None:
+         self.misses += 1
+         font = pygame.font.SysFont(face,size,bold)
+         
+         if len(self.fonts) >= self.max_fonts:
+            self.fonts.popitem(last=False)
+            
+      else:
+         self.hits += 1
+      
+      #re-inserting marks the font as the most recently used
+      self.fonts[key] = font
+      
+      return font
+      
+   #--------------------------------------------------------------------------
+   
+   def report(self,stream=sys.stdout):
+      stream.write("FONT CACHE\nfonts: %d  hits: %d  misses: %d\n" %
+                   (len(self.fonts),self.hits,self.misses))
+                   
+##############################################################################
+# SHARED CACHE
+##############################################################################
+
+#used for all text drawn by the game
+FONT_CACHE = FontCache()
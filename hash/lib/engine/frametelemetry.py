@@ -0,0 +1,222 @@
+##############################################################################
+# frametelemetry.py
+##############################################################################
+# Measures how long each frame takes, split into input, update and render
+# time, and keeps fixed-size histograms of the results so that long
+# sessions don't use more memory.  The results can be exported as JSON or
+# CSV at the end of a session.
+##############################################################################
+# 10/26 - GoshDarnGames
+##############################################################################
+
+import csv
+import json
+
+##############################################################################
+# CONSTANTS
+##############################################################################
+
+#width of each histogram bucket in milliseconds
+BUCKET_MS = 0.1
+
+#times above this go into the overflow bucket (their maximum is still kept)
+MAX_BUCKET_MS = 200.0
+
+#phases of a frame, in the order they are exported
+PHASES = ("input","update","render","frame")
+
+##############################################################################
+# HISTOGRAM
+##############################################################################
+
+class Histogram:
+   """
+   Fixed memory histogram of times in milliseconds.
+   """
+   
+   def __init__(self,bucket_ms=BUCKET_MS,max_ms=MAX_BUCKET_MS):
+      
+      self.bucket_ms = bucket_ms
+      
+      #the last bucket counts everything from max_ms up
+      self.buckets = [0] * (int(max_ms / bucket_ms) + 1)
+      
+      self.count = 0
+      self.total = 0.0
+      self.max = 0.0
+   
+   #--------------------------------------------------------------------------
+   
+   def add(self,ms):
+      
+      idx = min(int(ms / self.bucket_ms),len(self.buckets)-1)
+      self.buckets[idx] += 1
+      
+      self.count += 1
+      self.total += ms
+      
+      if ms > self.max:
+         self.max = ms
+   
+   #--------------------------------------------------------------------------
+   
+   def percentile(self,percent):
+      """
+      Returns the given percentile, interpolated within the bucket holding
+      it as if that bucket's times were spread evenly across it.  Below
+      the overflow bucket this is accurate to within bucket_ms.
+      """
+      
+      if self.count == 0:
+         return 0.0
+      
+      target = self.count * percent / 100.0
+      seen = 0
+      
+      for idx,bucket_count in enumerate(self.buckets):
+         
+         if bucket_count > 0 and seen + bucket_count >= target:
+            
+            lower = idx * self.bucket_ms
+            
+            #nothing is above the maximum, and the overflow bucket reaches
+            #up to it
+            upper = min((idx+1) * self.bucket_ms,self.max)
+            if idx == len(self.buckets)-1:
+               upper = self.max
+            
+            fraction = (target - seen) / bucket_count
+            return lower + fraction * (upper - lower)
+         
+         seen += bucket_count
+      
+      return self.max
+   
+   #--------------------------------------------------------------------------
+   
+   def summary(self):
+      """
+      Returns a dict of the mean, p50, p95, p99 and max in milliseconds,
+      and the resolution of the percentiles.
+      """
+      
+      mean = 0.0
+      if self.count > 0:
+         mean = self.total / self.count
+      
+      return {"mean" : round(mean,3),
+              "p50" : round(self.percentile(50),3),
+              "p95" : round(self.percentile(95),3),
+              "p99" : round(self.percentile(99),3),
+              "max" : round(self.max,3),
+              "resolution" : self.bucket_ms}
+
+##############################################################################
+# FRAME TELEMETRY
+##############################################################################
+
+class FrameTelemetry:
+   """
+   Collects frame timings reported by the CPU spinner and the pygame events
+   manager or event player.  A frame is the ticks run before a render plus the render
+   itself.  Input time is measured inside the ticks, so update time is the
+   tick time that wasn't spent on input.
+   """
+   
+   def __init__(self,fps):
+      """
+      fps - target frame rate, frames that take longer than 1/fps seconds
+            of work are counted as overruns
+      """
+      
+      self.budget_ms = 0.0
+      if fps > 0:
+         self.budget_ms = 1000.0 / fps
+      
+      self.histograms = dict((phase,Histogram()) for phase in PHASES)
+      
+      self.frames = 0
+      self.overruns = 0
+      
+      #seconds spent in each part of the current frame
+      self._input = 0.0
+      self._ticks = 0.0
+   
+   #--------------------------------------------------------------------------
+   
+   def add_input(self,seconds):
+      self._input += seconds
+   
+   #--------------------------------------------------------------------------
+   
+   def add_tick(self,seconds):
+      self._ticks += seconds
+   
+   #--------------------------------------------------------------------------
+   
+   def end_frame(self,render_seconds):
+      """
+      Called after each render with the time it took.  Completes the frame.
+      """
+      
+      input_ms = self._input * 1000.0
+      update_ms = max(self._ticks - self._input,0.0) * 1000.0
+      render_ms = render_seconds * 1000.0
+      frame_ms = input_ms + update_ms + render_ms
+      
+      histograms = self.histograms
+      histograms["input"].add(input_ms)
+      histograms["update"].add(update_ms)
+      histograms["render"].add(render_ms)
+      histograms["frame"].add(frame_ms)
+      
+      self.frames += 1
+      
+      if self.budget_ms > 0 and frame_ms > self.budget_ms:
+         self.overruns += 1
+      
+      self._input = 0.0
+      self._ticks = 0.0
+   
+   #--------------------------------------------------------------------------
+   
+   def summary(self):
+      """
+      Returns the results as a dict suitable for writing out as JSON.
+      """
+      
+      phases = dict((phase,self.histograms[phase].summary())
+                    for phase in PHASES)
+      
+      return {"frames" : self.frames,
+              "budget_ms" : round(self.budget_ms,3),
+              "overruns" : self.overruns,
+              "phases" : phases}
+   
+   #--------------------------------------------------------------------------
+   
+   def export(self,path):
+      """
+      Writes the results to path, as CSV if it ends in .csv and as JSON
+      otherwise.
+      """
+      
+      summary = self.summary()
+      export_file = open(path,"wb")
+      
+      try:
+         if path.lower().endswith(".csv"):
+            writer = csv.writer(export_file)
+            writer.writerow(["phase","mean_ms","p50_ms","p95_ms","p99_ms",
+                             "max_ms","resolution_ms","frames","overruns"])
+            
+            for phase in PHASES:
+               stats = summary["phases"][phase]
+               writer.writerow([phase,stats["mean"],stats["p50"],
+                                stats["p95"],stats["p99"],stats["max"],
+                                stats["resolution"],summary["frames"],
+                                summary["overruns"]])
+         else:
+            json.dump(summary,export_file,indent=2,sort_keys=True)
+      finally:
+         export_file.close()
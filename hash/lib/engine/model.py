@@ -13,7 +13,7 @@ from systemevents import *
 class Model(SystemEventListener):
 
    def __init__(self,screen_size):
-      SystemEventListener.__init__(self)      
+      SystemEventListener.__init__(self,())      
       self.screen_size = screen_size
    
    #--------------------------------------------------------------------------
@@ -36,6 +36,24 @@ class GameObject:
    def render(self, screen):
       raise NotImplementedError
       
+   def get_dirty_rects(self):
+      """
+      Used by views that only redraw the parts of the screen that change.
+      Returns a sequence of screen rects the object has changed since the
+      last call, or None if it can't tell, in which case the whole screen
+      is redrawn.  Objects remember what they looked like on each call.
+      """
+      return None
+      
+   def get_version(self):
+      """
+      Returns a number that goes up whenever the object's appearance
+      changes, so that views can skip drawing while nothing has moved.
+      Returns None if the object doesn't keep track, in which case it is
+      drawn every frame.
+      """
+      return None
+      
 ##############################################################################
 # STATE
 ##############################################################################
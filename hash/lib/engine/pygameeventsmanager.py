@@ -7,14 +7,84 @@
 # 06/12 - GoshDarnGames
 ##############################################################################
 
+from timeit import default_timer
+
 from systemevents import *
 import pygame
 
+##############################################################################
+# CONSTANTS
+##############################################################################
+
+#pygame event types that are converted into system events.  Other types are
+#blocked so that they never reach the pygame event queue.
+INPUT_EVENT_TYPES = (pygame.QUIT,pygame.KEYDOWN,pygame.KEYUP,
+                     pygame.MOUSEBUTTONDOWN,pygame.MOUSEBUTTONUP,
+                     pygame.MOUSEMOTION)
+
+##############################################################################
+# POSITION SCALING
+##############################################################################
+
+def scale_pos(pos,pos_scale):
+   """
+   Returns a window position or movement in render surface pixels.
+   
+   pos_scale - (x, y) factors from window to render pixels, or None if the
+               game is rendered at the window size
+   """
+   
+   if pos_scale is None:
+      return pos
+      
+   return (int(pos[0]*pos_scale[0]),int(pos[1]*pos_scale[1]))
+
+##############################################################################
+# PYGAME EVENTS MANAGER
+##############################################################################
+
 class PygameEventsManager(SystemEventListener):
 
-   def __init__(self):
+   def __init__(self,event_types=INPUT_EVENT_TYPES,coalesce_motion=True,
+                pos_scale=None):
+      """
+      event_types - pygame event types to let through to the game
+      coalesce_motion - if True all mouse motion in a frame is posted as a
+                        single MouseMotionEvent at the end of the frame,
+                        with rel summed over the frame
+      pos_scale - (x, y) factors mapping window positions to the surface
+                  the game is rendered on, when it is scaled to the window
+      """
    
-      SystemEventListener.__init__(self)
+      SystemEventListener.__init__(self,(TickEvent,))
+      
+      self.coalesce_motion = coalesce_motion
+      self.pos_scale = pos_scale
+      
+      #drop unused event types at the SDL level
+      pygame.event.set_blocked(None)
+      pygame.event.set_allowed(list(event_types))
+      
+      #{ pygame event type : method returning the system event to post }
+      self._converters = dict()
+      
+      converters = ((pygame.QUIT,self._convert_quit),
+                    (pygame.KEYDOWN,self._convert_keyboard),
+                    (pygame.KEYUP,self._convert_keyboard),
+                    (pygame.MOUSEBUTTONDOWN,self._convert_mouse_button),
+                    (pygame.MOUSEBUTTONUP,self._convert_mouse_button),
+                    (pygame.MOUSEMOTION,self._convert_mouse_motion))
+                    
+      for event_type,converter in converters:
+         if event_type in event_types:
+            self._converters[event_type] = converter
+      
+      #there is at most one coalesced motion event a frame so the same
+      #instance is reused every time
+      self._motion_event = MouseMotionEvent((0,0),(0,0),(0,0,0))
+      
+      #FrameTelemetry to report input handling time to, if any
+      self.telemetry = None
       
    #--------------------------------------------------------------------------
       
@@ -22,39 +92,81 @@ class PygameEventsManager(SystemEventListener):
    
       if isinstance(event,TickEvent):
       
-         #get most recent pygame events
-         pygame_events = pygame.event.get()         
+         if self.telemetry is None:
+            self._process_input()
+         else:
+            start = default_timer()
+            self._process_input()
+            self.telemetry.add_input(default_timer() - start)
+            
+   #--------------------------------------------------------------------------
+   
+   def _process_input(self):
+      """
+      Converts the pygame events waiting on the queue into system events.
+      """
+      
+      converters = self._converters
+      coalesce_motion = self.coalesce_motion
+      
+      #last motion event this frame and the total movement
+      last_motion = None
+      rel_x = 0
+      rel_y = 0
+   
+      #convert the most recent pygame events into system events
+      for pygame_event in pygame.event.get():
+      
+         if coalesce_motion and pygame_event.type == pygame.MOUSEMOTION:
+            last_motion = pygame_event
+            rel_x += pygame_event.rel[0]
+            rel_y += pygame_event.rel[1]
+            continue
+      
+         converter = converters.get(pygame_event.type)
          
-         #convert pygame events into system events
-         for pygame_event in pygame_events:
+         #skip event types the game doesn't handle
+         if converter is None:
+            continue
+            
+         SystemEventManager.post(converter(pygame_event))
          
-            event_to_post = None
+      #post the motion for the whole frame
+      if last_motion is not None and \
+         pygame.MOUSEMOTION in converters:
          
-            #pygame quit (window closing)
-            if pygame_event.type == pygame.QUIT:
-               event_to_post = QuitEvent()
-               
-            #keyboard event
-            if pygame_event.type == pygame.KEYDOWN or \
-               pygame_event.type == pygame.KEYUP:
-               
-               event_to_post = KeyboardEvent(pygame_event.type,
-                                             pygame_event.key)
-               
-            #mouse button event
-            if pygame_event.type == pygame.MOUSEBUTTONUP or \
-               pygame_event.type == pygame.MOUSEBUTTONDOWN:
-               
-               event_to_post = MouseButtonEvent(pygame_event.type,
-                                                pygame_event.button,
-                                                pygame_event.pos)
-                                                
-            #mouse motion event
-            if pygame_event.type == pygame.MOUSEMOTION:
-               event_to_post = MouseMotionEvent(pygame_event.pos,
-                                                pygame_event.rel,
-                                                pygame_event.buttons)
-            
-            #post the event that has been generated
-            SystemEventManager.post(event_to_post)
-               
\ No newline at end of file
+         motion_event = self._motion_event
+         motion_event.pos = scale_pos(last_motion.pos,self.pos_scale)
+         motion_event.rel = scale_pos((rel_x,rel_y),self.pos_scale)
+         motion_event.window_pos = last_motion.pos
+         motion_event.window_rel = (rel_x,rel_y)
+         motion_event.buttons = last_motion.buttons
+         
+         SystemEventManager.post(motion_event)
+         
+   #--------------------------------------------------------------------------
+   
+   def _convert_quit(self,pygame_event):
+   
+      #pygame quit (window closing)
+      return QuitEvent()
+      
+   #--------------------------------------------------------------------------
+   
+   def _convert_keyboard(self,pygame_event):
+      return KeyboardEvent(pygame_event.type,pygame_event.key)
+      
+   #--------------------------------------------------------------------------
+   
+   def _convert_mouse_button(self,pygame_event):
+      return MouseButtonEvent(pygame_event.type,pygame_event.button,
+                              scale_pos(pygame_event.pos,self.pos_scale),
+                              pygame_event.pos)
+                              
+   #--------------------------------------------------------------------------
+   
+   def _convert_mouse_motion(self,pygame_event):
+      return MouseMotionEvent(scale_pos(pygame_event.pos,self.pos_scale),
+                              scale_pos(pygame_event.rel,self.pos_scale),
+                              pygame_event.buttons,pygame_event.pos,
+                              pygame_event.rel)
@@ -1,36 +1,356 @@
 ##############################################################################
 # pygameview.py
 ##############################################################################
-# View used to display the game in a pygame window.
+# View used to display the game in a pygame window, or draw it offscreen.
 ##############################################################################
 # 06/12 - GoshDarnGames
 ##############################################################################
 
 import os
+import sys
+import traceback
+from weakref import WeakKeyDictionary
+
 import pygame
 from systemevents import *
+from surfacefactory import is_display_format, set_format_surface
+from rendertarget import DisplayTarget
+
+##############################################################################
+# PYGAME VIEW
+##############################################################################
 
 class PygameView(SystemEventListener):
+   """
+   Draws the model in two layers.  Background objects are drawn onto a
+   retained surface that is only redrawn where they change, and the
+   visible objects are drawn over a copy of it each render.
+   """
    
-   def __init__(self,caption,size,bg_color):
+   def __init__(self,caption,size,bg_color,dirty_rects=False,
+                check_surfaces=False,target=None,render_size=None):
+      """
+      dirty_rects - if True only the parts of the screen that game objects
+                    report as changed are redrawn and sent to the display.
+                    The whole screen is still redrawn when the visible
+                    objects change or one can't tell what it changed.
+      check_surfaces - debugging aid, if True each surface drawn that isn't
+                       in the display format is reported on stderr.  Frames
+                       are drawn offscreen and copied to the display.
+      target - render target to draw on (see rendertarget.py), by default
+               a window is opened.  Surfaces are created in its format.
+      render_size - size of the surface frames are drawn on, by default
+                    the window size.  If it differs frames are drawn
+                    offscreen and scaled to the window once each render.
+      """
    
-      SystemEventListener.__init__(self)
+      SystemEventListener.__init__(self,(ModelUpdatedEvent,RenderEvent))
       
-      os.environ["SDL_VIDEO_CENTERED"] = "1"
-      pygame.display.set_caption(caption)
-      self.screen = pygame.display.set_mode(size)
+      if target is None:
+         target = DisplayTarget(caption,size)
+         
+      self.target = target
+      self.screen = target.surface
+      
+      set_format_surface(self.screen)
       
       self.bg_color = bg_color
+      self.dirty_rects = dirty_rects
+      
+      if render_size is None:
+         render_size = size
+         
+      self.scaled = tuple(render_size) != tuple(self.screen.get_size())
+      
+      #surface frames are drawn on and the retained background layer, both
+      #in the same format as the screen
+      if check_surfaces:
+         self.frame = _FormatCheckingSurface(render_size,self.screen)
+         self.background = _FormatCheckingSurface(render_size,self.screen)
+      elif self.scaled:
+         self.frame = _create_offscreen(render_size,self.screen)
+         self.background = _create_offscreen(render_size,self.screen)
+      else:
+         self.frame = self.screen
+         self.background = self.screen.copy()
+         
+      self.background.fill(bg_color)
+      
+      #most recent model update, drawn on the next render event
+      self.model_update = None
+      
+      #visible and background objects as of the last render and the sum of
+      #their versions
+      self._drawn_objects = None
+      self._background_objects = []
+      self._drawn_version = None
       
    #--------------------------------------------------------------------------
       
    def notify(self, event):
       
       if isinstance(event,ModelUpdatedEvent):
+         self.model_update = event
+         
+      if isinstance(event,RenderEvent) and self.model_update is not None:
+         
+         model_update = self.model_update
+         visible_objects = model_update.visible_objects
+         background_objects = model_update.background_objects
+         
+         #skip the render entirely if nothing has changed since the last one
+         version = self._get_version(visible_objects,background_objects)
+         
+         if version is not None and version == self._drawn_version and \
+            self._same_objects(visible_objects,self._drawn_objects) and \
+            self._same_objects(background_objects,self._background_objects):
+            return
+            
+         self._drawn_version = version
+         
+         background_rects = self._update_background(background_objects)
+         
+         if self.dirty_rects:
+            self._render_dirty(visible_objects,background_rects)
+         else:
+            self._render_full(visible_objects)
+            
+         #copy, states reuse their visible objects list between updates
+         self._drawn_objects = list(visible_objects)
+            
+   #--------------------------------------------------------------------------
+   
+   def _get_version(self,visible_objects,background_objects):
+      """
+      Returns the sum of the objects' versions, or None if any of them
+      don't keep one.  Versions only go up, so the sum only stays the same
+      if none of them have changed.
+      """
+      
+      version = 0
+      
+      for objects in (visible_objects,background_objects):
+         for game_object in objects:
+         
+            object_version = game_object.get_version()
+            
+            if object_version is None:
+               return None
+               
+            version += object_version
+            
+      return version
+      
+   #--------------------------------------------------------------------------
+   
+   def _same_objects(self,objects,drawn_objects):
+      """
+      Returns True if objects holds the same game objects, in the same
+      order, as drawn_objects did at the last render.  States pass lists or
+      tuples so they are compared item by item.
+      """
+      
+      if drawn_objects is None or len(objects) != len(drawn_objects):
+         return False
+         
+      for idx in xrange(len(objects)):
+         if objects[idx] is not drawn_objects[idx]:
+            return False
+            
+      return True
+      
+   #--------------------------------------------------------------------------
+   
+   def _update_background(self,background_objects):
+      """
+      Brings the background layer up to date.  Returns the rects of the
+      layer that were redrawn, or None if all of it was.
+      """
+      
+      redraw = not self._same_objects(background_objects,
+                                      self._background_objects)
+      dirty_rects = []
+      
+      for game_object in background_objects:
+         
+         object_rects = game_object.get_dirty_rects()
+         
+         if object_rects is None:
+            redraw = True
+         else:
+            for rect in object_rects:
+               if rect not in dirty_rects:
+                  dirty_rects.append(rect)
+                  
+      self._background_objects = list(background_objects)
+      
+      background = self.background
+      
+      if redraw:
+         
+         background.fill(self.bg_color)
+         
+         for game_object in background_objects:
+            game_object.render(background)
+            
+         return None
+         
+      for rect in dirty_rects:
+      
+         background.set_clip(rect)
+         background.fill(self.bg_color)
+         
+         for game_object in background_objects:
+            game_object.render(background)
+            
+      background.set_clip(None)
+      
+      return dirty_rects
+      
+   #--------------------------------------------------------------------------
+   
+   def _render_full(self,visible_objects):
+   
+      frame = self.frame
+      
+      frame.blit(self.background,(0,0))
+      
+      for game_object in visible_objects:
+         game_object.render(frame)
          
-         self.screen.fill(self.bg_color)
+      self._present(None)
       
-         for game_object in event.visible_objects:
-            game_object.render(self.screen)
+   #--------------------------------------------------------------------------
+   
+   def _render_dirty(self,visible_objects,background_rects):
+   
+      #every object is asked so that they all remember what was drawn
+      full_redraw = background_rects is None or \
+                    not self._same_objects(visible_objects,
+                                           self._drawn_objects)
+                    
+      dirty_rects = []
+      
+      if background_rects is not None:
+         dirty_rects.extend(background_rects)
+      
+      for game_object in visible_objects:
+         
+         object_rects = game_object.get_dirty_rects()
+         
+         if object_rects is None:
+            full_redraw = True
+         else:
+            for rect in object_rects:
+               if rect not in dirty_rects:
+                  dirty_rects.append(rect)
+                  
+      if full_redraw:
+         self._render_full(visible_objects)
+         return
+         
+      if len(dirty_rects) == 0:
+         return
+         
+      frame = self.frame
+      background = self.background
+      
+      #restore the background under each rect then redraw everything that
+      #overlaps it, clipped to the rect
+      for rect in dirty_rects:
+      
+         frame.set_clip(rect)
+         frame.blit(background,rect,rect)
+         
+         for game_object in visible_objects:
+            game_object.render(frame)
             
-         pygame.display.flip()
\ No newline at end of file
+      frame.set_clip(None)
+      
+      self._present(dirty_rects)
+      
+   #--------------------------------------------------------------------------
+   
+   def _present(self,dirty_rects):
+      """
+      Copies the frame to the screen if it was drawn offscreen and shows
+      it.  dirty_rects are the parts of the frame that were redrawn, or
+      None if all of it was.
+      """
+      
+      frame = self.frame
+      screen = self.screen
+      
+      #scaled frames are copied whole, the edges of scaled rects depend on
+      #rounding
+      if self.scaled:
+         pygame.transform.scale(frame,screen.get_size(),screen)
+         self.target.present()
+         
+      elif frame is not screen:
+      
+         if dirty_rects is None:
+            screen.blit(frame,(0,0))
+         else:
+            for rect in dirty_rects:
+               screen.blit(frame,rect,rect)
+               
+         self.target.present(dirty_rects)
+         
+      else:
+         self.target.present(dirty_rects)
+      
+##############################################################################
+# OFFSCREEN SURFACES
+##############################################################################
+
+def _create_offscreen(size,screen):
+   """
+   Returns a surface of size in the same format as screen, including its
+   palette, so that it can be copied or scaled to the screen as it is.
+   """
+   
+   surface = pygame.Surface(size,0,screen)
+   
+   if screen.get_bitsize() == 8:
+      surface.set_palette(screen.get_palette())
+      
+   return surface
+
+##############################################################################
+# FORMAT CHECKING SURFACE
+##############################################################################
+
+class _FormatCheckingSurface(pygame.Surface):
+   """
+   Offscreen surface in the display format that reports the first blit of
+   each surface that isn't in the display format, along with where it was
+   blitted from.  Such surfaces should be created with the surface factory.
+   """
+   
+   def __init__(self,size,screen):
+   
+      pygame.Surface.__init__(self,size,0,screen)
+      
+      if screen.get_bitsize() == 8:
+         self.set_palette(screen.get_palette())
+      
+      #surfaces that have already been reported
+      self.reported = WeakKeyDictionary()
+      
+   #--------------------------------------------------------------------------
+   
+   def blit(self,source,dest,area=None,special_flags=0):
+   
+      if source not in self.reported and not is_display_format(source):
+      
+         self.reported[source] = True
+         
+         filename,line = traceback.extract_stack(limit=2)[0][:2]
+         
+         sys.stderr.write("unconverted %dx%d %d bit surface drawn at %s:%d\n"
+                          % (source.get_width(),source.get_height(),
+                             source.get_bitsize(),os.path.basename(filename),
+                             line))
+                             
+      return pygame.Surface.blit(self,source,dest,area,special_flags)
@@ -0,0 +1,64 @@
+##############################################################################
+# rendertarget.py
+##############################################################################
+# Surfaces the PygameView can draw frames on.  The display target draws in
+# the game window.  The surface target draws offscreen so that frames can be
+# captured without a window, for example to compare renders pixel by pixel
+# or to time rendering on its own.
+##############################################################################
+# 10/26 - GoshDarnGames
+##############################################################################
+
+import os
+import pygame
+
+##############################################################################
+# DISPLAY TARGET
+##############################################################################
+
+class DisplayTarget:
+   """
+   Draws in the game window.
+   """
+   
+   def __init__(self,caption,size):
+      
+      os.environ["SDL_VIDEO_CENTERED"] = "1"
+      pygame.display.set_caption(caption)
+      self.surface = pygame.display.set_mode(size)
+   
+   #--------------------------------------------------------------------------
+   
+   def present(self,rects=None):
+      """
+      Shows what has been drawn on the surface.  If rects are given only
+      those parts of the window are updated.
+      """
+      
+      if rects is None:
+         pygame.display.flip()
+      else:
+         pygame.display.update(rects)
+
+##############################################################################
+# SURFACE TARGET
+##############################################################################
+
+class SurfaceTarget:
+   """
+   Draws on a 32 bit offscreen surface.  Each frame stays on the surface
+   until the next one is drawn over it.  Doesn't need a display mode to be
+   set.
+   """
+   
+   def __init__(self,size):
+      
+      self.surface = pygame.Surface(size,0,32)
+      
+      #number of frames drawn
+      self.frames = 0
+   
+   #--------------------------------------------------------------------------
+   
+   def present(self,rects=None):
+      self.frames += 1
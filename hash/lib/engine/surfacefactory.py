@@ -0,0 +1,141 @@
+##############################################################################
+# surfacefactory.py
+##############################################################################
+# Creates surfaces in the display's pixel format.  Surfaces in any other
+# format are converted every time they are blitted to the screen, so
+# everything that is drawn more than once should come from here.
+#
+# Views drawing offscreen can set the surface they draw on as the format
+# to use instead.  Until a display mode or format surface is set surfaces
+# are left in pygame's default format.
+##############################################################################
+# 10/26 - GoshDarnGames
+##############################################################################
+
+import pygame
+
+#surface whose format new surfaces are given, None to use the display
+_format_surface = None
+
+##############################################################################
+# SURFACE FACTORY
+##############################################################################
+
+def create_surface(size,alpha=False):
+   """
+   Returns a new surface in the display format.
+   
+   size - (width, height) of the surface
+   alpha - if True the surface has per-pixel alpha
+   """
+   
+   if alpha:
+      surf = pygame.Surface(size,pygame.SRCALPHA,32)
+   else:
+      surf = pygame.Surface(size)
+      
+      #nothing is drawn yet, so a palettized surface can just take the
+      #format surface's colours
+      format_surface = get_format_surface()
+      
+      if format_surface is not None and surf.get_bitsize() == 8 and \
+         format_surface.get_bitsize() == 8:
+         surf.set_palette(format_surface.get_palette())
+   
+   return to_display_format(surf,alpha)
+
+#-----------------------------------------------------------------------------
+
+def set_format_surface(surface):
+   """
+   Makes surfaces created from now on match the format of surface, such as
+   an offscreen render target.  None goes back to matching the display.
+   """
+   
+   global _format_surface
+   _format_surface = surface
+
+#-----------------------------------------------------------------------------
+
+def get_format_surface():
+   """
+   Returns the surface whose format is being matched, or None if there
+   isn't one yet.
+   """
+   
+   if _format_surface is not None:
+      return _format_surface
+      
+   return pygame.display.get_surface()
+
+#-----------------------------------------------------------------------------
+
+def to_display_format(surf,alpha=None):
+   """
+   Returns surf converted to the display format, or surf itself if it is
+   already in it or there is no display yet.
+   
+   alpha - if True per-pixel alpha is kept.  Defaults to whether surf
+           has per-pixel alpha, which is the case for antialiased text.
+   """
+   
+   format_surface = get_format_surface()
+   
+   if format_surface is None:
+      return surf
+   
+   if alpha is None:
+      alpha = surf.get_flags() & pygame.SRCALPHA != 0
+   
+   if is_display_format(surf,alpha):
+      return surf
+   
+   if alpha:
+   
+      #convert_alpha needs a display mode, offscreen the surface is used
+      #as it is
+      if pygame.display.get_surface() is None:
+         return surf
+         
+      return surf.convert_alpha(format_surface)
+   
+   return surf.convert(format_surface)
+
+#-----------------------------------------------------------------------------
+
+def is_display_format(surf,alpha=None):
+   """
+   Returns True if surf can be blitted to the display without being
+   converted, or if there is no display to compare it with.
+   """
+   
+   screen = get_format_surface()
+   
+   if screen is None:
+      return True
+   
+   if alpha is None:
+      alpha = surf.get_flags() & pygame.SRCALPHA != 0
+   
+   if alpha:
+      
+      #convert_alpha always gives 32 bits, in the display's channel order
+      #when the display has one
+      if surf.get_bitsize() != 32:
+         return False
+      
+      if screen.get_bitsize() < 24:
+         return True
+      
+      return surf.get_masks()[:3] == screen.get_masks()[:3]
+   
+   if surf.get_bitsize() != screen.get_bitsize() or \
+      surf.get_masks() != screen.get_masks():
+      return False
+   
+   #blitting between palettized surfaces copies palette indices, so the
+   #colours only come out right if the palettes match
+   if surf.get_bitsize() == 8:
+      return surf.get_palette() == screen.get_palette()
+   
+   return True
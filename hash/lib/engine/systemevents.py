@@ -16,15 +16,42 @@ from weakref import WeakKeyDictionary
 
 class TickEvent(Event):
    """
-   Generated by the CPU Spinner when a game loop occurs
+   Generated by the CPU Spinner when a game loop occurs.  The event has no
+   data so the shared TICK_EVENT instance is posted each time.
    """
-   pass
+   __slots__ = ()
+   
+class RenderEvent(Event):
+   """
+   Generated by the CPU Spinner when the game should be drawn.  Rendering
+   runs separately from ticks and frames are skipped when the game falls
+   behind.  The shared RENDER_EVENT instance is posted each time.
+   """
+   __slots__ = ()
+   
+class IdleEvent(Event):
+   """
+   Posted by a state after a tick when nothing will change on screen until
+   input arrives or timeout seconds have passed, so the game loop can sleep
+   instead of ticking.  The state must post it again on every tick it
+   wants to stay idle.
+   """
+   
+   __slots__ = ("timeout",)
+   
+   def __init__(self,timeout=None):
+      """
+      timeout - seconds to wait for input before ticking again, or None to
+                wait until input arrives
+      """
+      
+      self.timeout = timeout
    
 class QuitEvent(Event):
    """
    Generated by the model when the user tries to quit the game.
    """
-   pass
+   __slots__ = ()
    
 class KeyboardEvent(Event):
    """
@@ -32,6 +59,8 @@ class KeyboardEvent(Event):
    key.
    """   
    
+   __slots__ = ("type","key")
+   
    def __init__(self,type,key):
       """
       type - pygame.KEYUP or pygame.KEYDOWN
@@ -47,48 +76,88 @@ class MouseButtonEvent(Event):
    a mouse button.
    """
    
-   def __init__(self,type,button,pos):
+   __slots__ = ("type","button","pos","window_pos")
+   
+   def __init__(self,type,button,pos,window_pos=None):
       """
       type - pygame.MOUSEBUTTONUP or pygame.MOUSEBUTTONDOWN
       button - which mouse button was pressed
-      pos - position of the mouse at time of event
+      pos - position of the mouse at time of event, in render pixels
+      window_pos - position in window pixels, defaults to pos.  This is
+                   what is recorded so that replays don't depend on the
+                   render size.
       """
       
+      if window_pos is None:
+         window_pos = pos
+      
       self.type = type                            
       self.button = button
       self.pos = pos
+      self.window_pos = window_pos
       
 class MouseMotionEvent(Event):
    """
    Generated by the pygame event monitor when the user moves the mouse.
    """
    
-   def __init__(self,pos,rel,buttons):
+   __slots__ = ("pos","rel","buttons","window_pos","window_rel")
+   
+   def __init__(self,pos,rel,buttons,window_pos=None,window_rel=None):
       """
-      pos - new position of the mouse
-      rel - position relative to the old position
+      pos - new position of the mouse, in render pixels
+      rel - position relative to the old position, in render pixels
       buttons - which buttons are being pressed
+      window_pos, window_rel - pos and rel in window pixels, default to
+                               pos and rel.  These are what is recorded.
       """
+      
+      if window_pos is None:
+         window_pos = pos
+         
+      if window_rel is None:
+         window_rel = rel
             
       self.pos = pos
       self.rel = rel
       self.buttons = buttons
+      self.window_pos = window_pos
+      self.window_rel = window_rel
       
 class ModelUpdatedEvent(Event):
    """
-   Generated by the model after it processes a tick event.
+   Generated by the model after it processes a tick event.  States create
+   one of these up front and post it every tick, updating the lists it
+   refers to in place.
    """
    
-   def __init__(self,visible_objects,game_objects):
+   __slots__ = ("visible_objects","game_objects","background_objects")
+   
+   def __init__(self,visible_objects,game_objects,background_objects=()):
       """
       visible_objects - Game objects that are to be drawn on screen.
                         They will be drawn in the order they appear in this
                         list.
       game_objects - All game objects tracked by the state.
+      background_objects - Game objects drawn underneath the visible objects
+                           that rarely change.  Views may keep them drawn
+                           on a retained layer and only redraw the parts
+                           they report as dirty.
       """
    
       self.visible_objects = visible_objects
       self.game_objects = game_objects
+      self.background_objects = background_objects
+      
+##############################################################################
+# SHARED EVENT INSTANCES
+##############################################################################
+
+#posted by the CPU Spinner every time the game loops
+TICK_EVENT = TickEvent()
+
+#posted by the CPU Spinner when the game should be drawn
+RENDER_EVENT = RenderEvent()
 
 ##############################################################################
 # LISTENER
@@ -96,12 +165,14 @@ class ModelUpdatedEvent(Event):
 
 class SystemEventListener(Listener):
    
-   def __init__(self):
+   def __init__(self,event_types=(Event,)):
       """
       Creates a System Event Listener that will register itself with the
       System Event Manager.
+      
+      event_types - system event classes this listener is notified of
       """
-      Listener.__init__(self,SystemEventManager)
+      Listener.__init__(self,SystemEventManager,event_types)
 
 ##############################################################################
 # EVENTS MANAGER
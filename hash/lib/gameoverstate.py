@@ -13,11 +13,15 @@ from engine.model import State
 from engine.systemevents import *
 
 from gui import Text
+from layout import Layout
 
 ##############################################################################
 # CONSTANTS
 ##############################################################################
 
+#positions and sizes are given for the design screen size (see layout.py)
+
+CENTER_X = 320
 GAME_OVER_Y = 30
 YOUR_SCORE_Y = 150
 HIGH_SCORE_Y = 300
@@ -32,17 +36,19 @@ class GameOverState(State,SystemEventListener):
    def __init__(self,model,new_score,old_high_score):
    
       State.__init__(self,model)
-      SystemEventListener.__init__(self)
+      SystemEventListener.__init__(self,(TickEvent,KeyboardEvent))
       
       self.text_objects = []
       
-      game_over = Text((0,0),"GAME OVER",(255,0,0),50)
-      game_over.rect.center = (320,GAME_OVER_Y)
+      layout = Layout(model.screen_size)
+      
+      game_over = Text((0,0),"GAME OVER",(255,0,0),layout.size(50))
+      game_over.rect.center = layout.point((CENTER_X,GAME_OVER_Y))
       self.text_objects.append(game_over)
       
       your_score = Text((0,0),"You scored: "+str(new_score[1]),
-                        (255,255,255),30)
-      your_score.rect.center = (320,YOUR_SCORE_Y)
+                        (255,255,255),layout.size(30))
+      your_score.rect.center = layout.point((CENTER_X,YOUR_SCORE_Y))
       self.text_objects.append(your_score)
       
       high_score_str = ""
@@ -54,20 +60,28 @@ class GameOverState(State,SystemEventListener):
          high_score_str = "High Score: "+str(old_high_score[1])+" ("+ \
                           old_high_score[0]+")"
                           
-      high_score = Text((0,0),high_score_str,(255,255,0),30)
-      high_score.rect.center = (320,HIGH_SCORE_Y)
+      high_score = Text((0,0),high_score_str,(255,255,0),layout.size(30))
+      high_score.rect.center = layout.point((CENTER_X,HIGH_SCORE_Y))
       self.text_objects.append(high_score)
       
-      press_any = Text((0,0),"Press any key to play again",(0,255,0),20)
-      press_any.rect.center = (320,PRESS_ANY_Y)
+      press_any = Text((0,0),"Press any key to play again",(0,255,0),
+                       layout.size(20))
+      press_any.rect.center = layout.point((CENTER_X,PRESS_ANY_Y))
       self.text_objects.append(press_any)
       
+      #the screen never changes so the same event is posted every tick
+      self.model_updated_event = ModelUpdatedEvent(self.text_objects,[])
+      
+      #nothing happens until a key is pressed
+      self.idle_event = IdleEvent()
+      
    #--------------------------------------------------------------------------   
       
    def notify(self,event):
       
       if isinstance(event,TickEvent):         
-         SystemEventManager.post(ModelUpdatedEvent(self.text_objects,[]))
+         SystemEventManager.post(self.model_updated_event)
+         SystemEventManager.post(self.idle_event)
          
       if isinstance(event,KeyboardEvent):
          from gamestate import GameState
@@ -1,26 +1,43 @@
 ##############################################################################
 # gamestate.py
 ##############################################################################
-# Classes related to the game play state.
+# Classes related to the game play state.  The rules themselves are in
+# simulation.py, this state plays a simulation and draws it.
 ##############################################################################
 # 03/13 GoshDarnGames
 ##############################################################################
 
 import pygame
 import random
+import itertools
+from collections import OrderedDict
 from weakref import WeakKeyDictionary       
+
+#NumPy is optional, it lets the instruction queue draw all of its data in
+#one go
+try:
+   import numpy
+   import pygame.surfarray
+except ImportError:
+   numpy = None
        
 from engine.model import *
 from engine.events import *
 from engine.systemevents import *
+from engine.fontcache import FONT_CACHE
+from engine.surfacefactory import create_surface
 
 from gui import *
+from layout import Layout
+from simulation import *
 from highscorestate import HighScoreState
 
 ##############################################################################
 # CONSTANTS
 ##############################################################################
 
+#positions and sizes are given for the design screen size (see layout.py)
+
 BG_COLOR = (0,0,0)
 
 #BOX CONSTANTS
@@ -28,6 +45,7 @@ BOX_NORMAL_COLOR = (0,255,0)
 BOX_MO_COLOR = (255,0,255)
 BOX_FONT_COLOR = (255,255,255)
 BOX_BORDER_SIZE = 6
+BOX_SIZE = 480/3
 NUM_FONTSIZE = 78
 
 #PROGRESS BAR CONSTANTS
@@ -35,26 +53,51 @@ PROGRESS_RECT = pygame.Rect((30,90),(580,300))
 PROGRESS_BG_COLOR = (100,100,100)
 PROGRESS_BAR_COLOR = (100,255,100)
 PROGRESS_BAR_TL = (60,200)
+PROGRESS_BAR_SIZE = (640-60*2,(240-200)*2)
 PROGRESS_TEXT_Y = 120
 PROGRESS_FONT_SIZE = 60
 
-#OP-CODES
-INSERT = 1
-REMOVE = 2
+#screen area the instruction queue is drawn in
+INSTRUCTION_COLUMN_RECT = pygame.Rect((500,0),(140,480))
+
+#top of the first instruction and the distance between instructions
+FIRST_INSTRUCTION_Y = 400
+INSTRUCTION_SPACING = 80
+
+#positions of each instruction's arrow tip and data, relative to its top
+ARROW_TIP = (500,40)
+DATA_TOPLEFT = (580,15)
+
+#data items are 2x2 cells of colour
+DATA_CELL_SIZE = 25
+
+#most data surfaces kept before the least recently used one is dropped
+MAX_DATA_SPRITES = 32
+
+#the data of every queued instruction is drawn on one surface, tall enough
+#for a full queue, with the first instruction's data at the bottom
+DATA_COLUMN_COLORKEY = (0,0,0)
 
-#number of frames for an operation (i.e. frames = num_data * operation_time)
-OPERATION_TIME = 30
+#build the data column with NumPy, if it is installed, rather than from
+#the cached data sprites.  Off by default: for at most seven instructions
+#the sprites are quicker (see queuebench.py).
+USE_NUMPY = False
 
-#INSTRUCTION QUEUE CONSTANTS
-MAX_INSTRUCTIONS = 7
-INITIAL_DELAY = 900
-DELAY_DECAY = 10
-MIN_DELAY = 180
+#arrow outlines relative to their tips, and the color that is transparent
+#in the arrow sprites
+INSERT_ARROW_POINTS = ((0,0),(20,20),(20,10),(60,10),
+                       (60,-10),(20,-10),(20,-20),(0,0))
+REMOVE_ARROW_POINTS = ((0,0),(0,10),(40,10),(40,20),(60,0),
+                       (40,-20),(40,-10),(0,-10),(0,0))
+ARROW_COLORKEY = (0,0,0)
 
-#DATA CONSTANTS
+#DATA CONSTANTS, one colour for each of the simulation's NUM_COLORS
 DATA_COLORS = ((255,0,0),(255,0,255),(255,255,0),
                (0,255,255),(0,0,255),(0,255,0))               
-INITIAL_MIN_DATA_IN_BOXES = 8
+
+#colours of the cells of each data item, indexed by its encoding (see
+#simulation.py)
+DATA_ITEMS = tuple(itertools.product(DATA_COLORS,repeat=DATA_CELLS))
 
 #ERROR MSG CONSTANTS
 ERROR_RECT = pygame.Rect((30,90),(580,300))
@@ -65,52 +108,28 @@ ERROR_TEXT_FONTSIZE = 30
 ERROR_BG_COLOR = (255,0,0)
 ERROR_TITLE = "ERROR"
 ERROR_TEXT = "Data not found in this box."
-ERROR_TIME = 120
 
 ##############################################################################
 # GAME EVENTS
 ##############################################################################
 
-class GameTick(Event):
-   """
-   Generated by the game state so that objects can process ticks before the
-   ModelUpdated event is posted.
-   """
-   pass
-   
-class ProgressComplete(Event):
-   """
-   Posted by the progress bar when its action is complete.  Contains the
-   reference number of the box that was being processed.
-   """
-   
-   def __init__(self,box_num):
-      """
-      box_num - the box that the operation pending was in relation to.
-      """
-      self.box_num = box_num
-   
 class InstructionAdded(Event):
    """
-   Posted by the game state when a new instruction is added to the queue.
+   Posted by the game state when the simulation adds a new instruction to
+   the queue.
    """
    
+   __slots__ = ("instruction",)
+   
    def __init__(self,instruction):
       self.instruction = instruction
       
 class InstructionSuccessful(Event):
    """
    Posted by the game state class when the player successfully completes the
-   first instruction on the queue
-   """
-   pass
-   
-class ErrorComplete(Event):
+   first instruction on the queue in the simulation
    """
-   Posted by the error message class when its time has elapsed, allowing the
-   game state to remove the dialogue
-   """
-   pass
+   __slots__ = ()
       
 ##############################################################################
 # GAME EVENTS - MANAGER AND LISTENER CLASSES
@@ -121,8 +140,8 @@ class GameEventManager(EventManager):
 
 class GameEventListener(Listener):
    
-   def __init__(self):
-      Listener.__init__(self,GameEventManager)
+   def __init__(self,event_types=(Event,)):
+      Listener.__init__(self,GameEventManager,event_types)
 
 ##############################################################################
 # GAME OBJECTS - BOX
@@ -130,9 +149,10 @@ class GameEventListener(Listener):
 
 class Box(Button):
    
-   def __init__(self,num,rect):
+   def __init__(self,num,rect,layout):
    
       self.num = num
+      self.layout = layout
    
       normal_surf = self._draw_box(BOX_NORMAL_COLOR,rect)
       mo_surf = self._draw_box(BOX_MO_COLOR,rect)
@@ -142,7 +162,7 @@ class Box(Button):
    def _draw_box(self,color,rect):
       
       #fill in fg color
-      box_surf = pygame.Surface((rect.width,rect.height))
+      box_surf = create_surface((rect.width,rect.height))
       
       #rect relative to the box surf
       box_rect = pygame.Rect(0,0,rect.width,rect.height)
@@ -150,12 +170,13 @@ class Box(Button):
       box_surf.fill(color)
       
       #paint background over center to make box hollow
-      bg_rect = box_rect.inflate(-1*BOX_BORDER_SIZE,-1*BOX_BORDER_SIZE)
+      border_size = self.layout.size(BOX_BORDER_SIZE)
+      bg_rect = box_rect.inflate(-1*border_size,-1*border_size)
       box_surf.fill(BG_COLOR,bg_rect)
       
       #add the number to the center
-      num_surf = pygame.font.SysFont("courier",NUM_FONTSIZE,True).\
-                                             render(str(self.num),True,color)
+      num_surf = FONT_CACHE.get("courier",self.layout.size(NUM_FONTSIZE),
+                                True).render(str(self.num),True,color)
       num_rect = pygame.Rect(0,0,num_surf.get_width(),num_surf.get_height())
       num_rect.center = box_rect.center
       
@@ -167,97 +188,174 @@ class Box(Button):
 # GAME OBJECTS - PROGRESS BAR
 ##############################################################################
 
-class ProgressBar(GameObject,GameEventListener,GUIEventListener):
+class ProgressBar(GameObject):
+   """
+   Shows how far through a simulation Operation the player is.
+   """
+
+   #background and caption, drawn once for each layout scale and shared by
+   #all progress bars { scale : surface }
+   _panels = dict()
 
-   def __init__(self,frames,box_num):
+   def __init__(self,operation,layout):
    
-      GameEventListener.__init__(self)
-      GUIEventListener.__init__(self)
+      self.operation = operation
+      self.layout = layout
+      
+      #where the panel and the full bar are drawn
+      self.rect = layout.rect(PROGRESS_RECT)
+      self.bar_rect = layout.rect(pygame.Rect(PROGRESS_BAR_TL,
+                                              PROGRESS_BAR_SIZE))
+      
+      #width of the bar as of the last get_dirty_rects call
+      self._drawn_width = None
+      
+   #--------------------------------------------------------------------------
+            
+   def render(self,screen):
    
-      self.frames = frames
-      self.initial_frames = frames
-      self.box_num = box_num
+      #draw background and text
+      screen.blit(ProgressBar._get_panel(self.layout),self.rect)
+      
+      #draw progress bar
+      screen.fill(PROGRESS_BAR_COLOR,self._get_bar_rect())
       
    #--------------------------------------------------------------------------
+   
+   def get_version(self):
+   
+      #frames the operation has run for
+      return self.operation.frames - self.operation.frames_left
       
-   def notify(self,event):
+   #--------------------------------------------------------------------------
    
-      if isinstance(event,GameTick):
-         self.frames -= 1
+   def get_dirty_rects(self):
+      
+      #the panel never changes, only the bar grows
+      bar_rect = self._get_bar_rect()
+      
+      if bar_rect.width == self._drawn_width:
+         return ()
          
-         if self.frames <= 0:
-            GameEventManager.post(ProgressComplete(self.box_num))
-            
+      self._drawn_width = bar_rect.width
+      
+      return (bar_rect,)
+      
    #--------------------------------------------------------------------------
-            
-   def render(self,screen):
    
-      #draw background
-      screen.fill(PROGRESS_BG_COLOR,PROGRESS_RECT)
+   def _get_bar_rect(self):
+   
+      max_width = self.bar_rect.width
       
-      #draw progress bar
-      max_width = 640 - PROGRESS_BAR_TL[0]*2
-      width = (float(max_width) / self.initial_frames)*  \
-              (self.initial_frames-self.frames)
+      #operations on empty boxes take no frames but are still drawn once
+      initial_frames = max(self.operation.frames,1)
+      width = (float(max_width) / initial_frames)*  \
+              (initial_frames-self.operation.frames_left)
       
-      height = (240 - PROGRESS_BAR_TL[1])*2
+      return pygame.Rect(self.bar_rect.topleft,(width,self.bar_rect.height))
       
-      progress_bar_rect = pygame.Rect(PROGRESS_BAR_TL,(width,height))
+   #--------------------------------------------------------------------------
+   
+   @staticmethod
+   def _get_panel(layout):
+      """
+      Returns the background of the progress bar with its text drawn on,
+      creating it the first time for each scale.  The text sits above the
+      bar so the bar can be drawn over the panel.
+      """
       
-      screen.fill(PROGRESS_BAR_COLOR,progress_bar_rect)
+      panel = ProgressBar._panels.get(layout.scale)
       
-      #draw text
-      text_surf = pygame.font.SysFont("courier",PROGRESS_FONT_SIZE,True).\
-                                      render("PROGRESS:",True,(0,0,0))
-                                      
-      text_rect = text_surf.get_rect()
-      text_rect.center = PROGRESS_RECT.center
-      text_rect.top = PROGRESS_TEXT_Y
+      if panel is None:
       
-      screen.blit(text_surf,text_rect)
+         panel_rect = layout.rect(PROGRESS_RECT)
+      
+         panel = create_surface(panel_rect.size)
+         panel.fill(PROGRESS_BG_COLOR)
+         
+         text_surf = FONT_CACHE.get("courier",
+                                    layout.size(PROGRESS_FONT_SIZE),True).\
+                                    render("PROGRESS:",True,(0,0,0))
+                                         
+         #position the text relative to the panel
+         text_rect = text_surf.get_rect()
+         text_rect.centerx = panel_rect.width/2
+         text_rect.top = layout.size(PROGRESS_TEXT_Y) - panel_rect.top
+         
+         panel.blit(text_surf,text_rect)
+         
+         ProgressBar._panels[layout.scale] = panel
+         
+      return panel
       
 ##############################################################################
 # GAME OBJECTS -  ERROR MESSAGE
 ##############################################################################
 
-class ErrorMessage(GameObject, GameEventListener):
+class ErrorMessage(GameObject):
+   """
+   Shown while the simulation's boxes can't be used after a wrong remove.
+   """
    
-   def __init__(self):
+   #background, title and message, drawn once for each layout scale and
+   #shared { scale : surface }
+   _panels = dict()
    
-      GameEventListener.__init__(self)
-      
-      self.frames_left = ERROR_TIME
+   def __init__(self,layout):
       
-   def notify(self,event):
-   
-      if isinstance(event,GameTick):
-         self.frames_left -= 1
-         
-         if self.frames_left <= 0:
-            GameEventManager.post(ErrorComplete())
+      self.layout = layout
+      self.rect = layout.rect(ERROR_RECT)
             
    def render(self,screen):
-   
-      #draw background
-      screen.fill(ERROR_BG_COLOR,ERROR_RECT)
+      screen.blit(ErrorMessage._get_panel(self.layout),self.rect)
       
-      #draw title
-      title_surf = pygame.font.SysFont("courier",ERROR_TITLE_FONTSIZE,True).\
-                                 render(ERROR_TITLE,True,(0,0,0))
-      title_rect = title_surf.get_rect()
-      title_rect.center = ERROR_RECT.center
-      title_rect.top = ERROR_TITLE_Y
+   def get_version(self):
+      #nothing changes while the message is shown
+      return 0
       
-      screen.blit(title_surf,title_rect)
+   def get_dirty_rects(self):
+      return ()
       
-      #draw message
-      text_surf = pygame.font.SysFont("courier",ERROR_TEXT_FONTSIZE,True).\
-                                     render(ERROR_TEXT,True,(0,0,0))
-      text_rect = text_surf.get_rect()
-      text_rect.center = ERROR_RECT.center
-      text_rect.top = ERROR_TEXT_Y
+   @staticmethod
+   def _get_panel(layout):
+      """
+      Returns the error message with its background, creating it the
+      first time for each scale.  Text is positioned relative to the panel.
+      """
       
-      screen.blit(text_surf,text_rect)
+      panel = ErrorMessage._panels.get(layout.scale)
+      
+      if panel is None:
+      
+         panel_rect = layout.rect(ERROR_RECT)
+      
+         #draw background
+         panel = create_surface(panel_rect.size)
+         panel.fill(ERROR_BG_COLOR)
+         
+         #draw title
+         title_surf = FONT_CACHE.get("courier",
+                                     layout.size(ERROR_TITLE_FONTSIZE),True).\
+                                     render(ERROR_TITLE,True,(0,0,0))
+         title_rect = title_surf.get_rect()
+         title_rect.centerx = panel_rect.width/2
+         title_rect.top = layout.size(ERROR_TITLE_Y) - panel_rect.top
+         
+         panel.blit(title_surf,title_rect)
+         
+         #draw message
+         text_surf = FONT_CACHE.get("courier",
+                                    layout.size(ERROR_TEXT_FONTSIZE),True).\
+                                    render(ERROR_TEXT,True,(0,0,0))
+         text_rect = text_surf.get_rect()
+         text_rect.centerx = panel_rect.width/2
+         text_rect.top = layout.size(ERROR_TEXT_Y) - panel_rect.top
+         
+         panel.blit(text_surf,text_rect)
+         
+         ErrorMessage._panels[layout.scale] = panel
+         
+      return panel
                                        
 ##############################################################################
 # GAME OBJECTS - INSTRUCTION QUEUE
@@ -265,93 +363,252 @@ class ErrorMessage(GameObject, GameEventListener):
       
 class InstructionQueue(GameObject,GameEventListener):
 
-   def __init__(self):
+   #surfaces showing each data item at each cell size, least recently used
+   #first.  Items stay in the queue for many frames so they are drawn once
+   #and reused.  { (data, cell size) : surface }
+   _data_sprites = OrderedDict()
+   
+   #{ scale : { opcode : (arrow surface, offset of its tip) } }, drawn once
+   #for each layout scale and shared
+   _arrow_sprites = dict()
+   
+   #NumPy array of the cell colours of every data item, made the first time
+   #the NumPy path is used
+   _data_rgb = None
+
+   def __init__(self,layout):
       
-      GameEventListener.__init__(self)
+      GameEventListener.__init__(self,(InstructionAdded,
+                                       InstructionSuccessful))
       
       self.queue = []
       
+      self.layout = layout
+      self.column_rect = layout.rect(INSTRUCTION_COLUMN_RECT)
+      
+      #sizes on the screen the queue is drawn on
+      self.spacing = layout.size(INSTRUCTION_SPACING)
+      self.cell_size = layout.size(DATA_CELL_SIZE)
+      self.data_size = self.cell_size*2
+      
+      #the data column's bottom lines up with the first instruction's data
+      first_y = layout.size(FIRST_INSTRUCTION_Y)
+      column_height = MAX_INSTRUCTIONS*self.spacing
+      self.data_column_topleft = (layout.size(DATA_TOPLEFT[0]),
+                                  first_y + layout.size(DATA_TOPLEFT[1]) +
+                                  self.data_size - column_height)
+      self.data_column_size = (self.data_size,column_height)
+      
+      #number of changes made to the queue and how many had been made as
+      #of the last get_dirty_rects call
+      self.version = 0
+      self._drawn_version = None
+      
+      #data of every queued instruction and the version it was drawn at
+      self.use_numpy = USE_NUMPY
+      self._data_column = None
+      self._data_column_version = None
+      
    #--------------------------------------------------------------------------
       
    def notify(self,event):
       
       if isinstance(event,InstructionAdded):
          self.queue.append(event.instruction)
+         self.version += 1
          
       if isinstance(event,InstructionSuccessful):
          del self.queue[0]
+         self.version += 1
          
    #--------------------------------------------------------------------------      
          
    def render(self,screen):
+   
+      if self._data_column_version != self.version:
+         self._draw_data_column()
+         self._data_column_version = self.version
+         
+      screen.blit(self._data_column,self.data_column_topleft)
+      
+      first_y = self.layout.size(FIRST_INSTRUCTION_Y)
       
       for idx,instruction in enumerate(self.queue):
-         self._draw_instruction(400-idx*80,instruction,screen)
+         self._draw_arrow(first_y-idx*self.spacing,instruction,screen)
          
    #--------------------------------------------------------------------------
    
-   def get_next_instruction(self):
+   def get_version(self):
+      return self.version
+      
+   #--------------------------------------------------------------------------
+   
+   def get_dirty_rects(self):
+      
+      if self.version == self._drawn_version:
+         return ()
+         
+      self._drawn_version = self.version
+      
+      #instructions all move down together, so redraw the whole column
+      return (self.column_rect,)
+      
+   #--------------------------------------------------------------------------
+   
+   def _draw_arrow(self,y,instruction,screen):
+      
+      #draw arrow with its tip at ARROW_TIP below the top of the instruction
+      arrow_sprites = InstructionQueue._get_arrow_sprites(self.layout)
+      arrow_surf,(tip_x,tip_y) = arrow_sprites[instruction.opcode]
+      
+      screen.blit(arrow_surf,(self.layout.size(ARROW_TIP[0])-tip_x,
+                              y+self.layout.size(ARROW_TIP[1])-tip_y))
+      
+   #--------------------------------------------------------------------------
+   
+   def _draw_data_column(self):
       """
-      Returns the instruction at the bottom of the queue.
+      Draws the data of each queued instruction onto the data column, the
+      first instruction at the bottom.  The gaps are transparent.
       """
       
-      if len(self.queue) is 0:
-         return None
+      if self._data_column is None:
+         self._data_column = create_surface(self.data_column_size)
+         self._data_column.set_colorkey(DATA_COLUMN_COLORKEY,pygame.RLEACCEL)
          
-      return self.queue[0]
+      data_column = self._data_column
+      
+      #anything past a full queue would be off the top of the screen
+      queue = self.queue[:MAX_INSTRUCTIONS]
+      
+      #NumPy can't write a whole colour into a palette surface
+      if self.use_numpy and numpy is not None and \
+         data_column.get_bytesize() > 1:
          
-   #--------------------------------------------------------------------------
+         #(instruction, row, column, rgb), last instruction first as the
+         #column is drawn top down
+         data = InstructionQueue._get_data_rgb()[[instruction.data
+                                                  for instruction in 
+                                                  reversed(queue)]]
          
-   def _draw_instruction(self,y,instruction,screen):
+         #each colour fills a square cell
+         cell_size = self.cell_size
+         cells = data.repeat(cell_size,axis=1).repeat(cell_size,axis=2)
+         
+         #each instruction takes a slot with its data at the bottom
+         data_size = self.data_size
+         slots = numpy.zeros((MAX_INSTRUCTIONS,self.spacing,data_size,3),
+                             numpy.uint8)
+         slots[MAX_INSTRUCTIONS-len(queue):,self.spacing-data_size:] = cells
+         
+         #surfarray indexes x before y
+         pygame.surfarray.blit_array(data_column,
+                                     slots.reshape(-1,data_size,3).\
+                                     swapaxes(0,1))
+                                     
+      else:
       
-      #draw data
-      data_surf = self._create_data_surf(instruction.data)
-      data_rect = pygame.Rect((580,y+15),(50,50))
-      screen.blit(data_surf,data_rect)
+         data_column.fill(DATA_COLUMN_COLORKEY)
+         
+         for idx,instruction in enumerate(queue):
+            data_column.blit(self._get_data_sprite(instruction.data),
+                             (0,self.data_column_size[1]-self.data_size-
+                                idx*self.spacing))
+                             
+   #--------------------------------------------------------------------------
+   
+   @staticmethod
+   def _get_data_rgb():
+      """
+      Returns the (data, row, column, rgb) array of data colours.
+      """
       
-      #draw arrow
+      if InstructionQueue._data_rgb is None:
+         InstructionQueue._data_rgb = numpy.array(DATA_ITEMS,numpy.uint8).\
+                                      reshape(NUM_DATA,2,2,3)
+                                      
+      return InstructionQueue._data_rgb
       
-      #actual position on screen to draw
-      pointlist = []
+   #--------------------------------------------------------------------------
+   
+   def _get_data_sprite(self,data):
+      """
+      Returns the surface for data, creating it if it isn't cached.
+      """
       
-      #relative points of the arrow
-      rel_pointlist = []
+      key = (data,self.cell_size)
       
-      arrow_color = None
+      data_sprites = InstructionQueue._data_sprites
+      data_surf = data_sprites.pop(key,None)
       
-      #set the relative points for an insert arrow
-      if instruction.opcode is INSERT:
-
-         arrow_color = (0,0,255)
+      if data_surf is None:
+         data_surf = self._create_data_surf(data)
          
-         rel_pointlist = [(0,0), (20,20),(20,10),(60,10),
-                          (60,-10),(20,-10),(20,-20),(0,0)]
-                             
-      #set the relative points for a remove arrow
-      if instruction.opcode == REMOVE:
-         arrow_color = (255,0,0)
+         if len(data_sprites) >= MAX_DATA_SPRITES:
+            data_sprites.popitem(last=False)
+            
+      #most recently used go last
+      data_sprites[key] = data_surf
+      
+      return data_surf
+      
+   #--------------------------------------------------------------------------
+   
+   @staticmethod
+   def _get_arrow_sprites(layout):
+      """
+      Returns the insert and remove arrows, drawing them the first time for
+      each scale.
+      """
+      
+      arrow_sprites = InstructionQueue._arrow_sprites.get(layout.scale)
+      
+      if arrow_sprites is None:
+      
+         arrow_sprites = dict()
          
-         rel_pointlist = [(0,0),(0,10),(40,10),(40,20),(60,0),
-                          (40,-20),(40,-10),(0,-10),(0,0)]
-                             
-      #convert the relative points into screen coordinates                    
-      arrow_x = 500
-      arrow_y = y+40
-      for point in rel_pointlist:
-         pointlist.append((point[0]+arrow_x,point[1]+arrow_y))
+         for opcode,color,design_pointlist in \
+                              ((INSERT,(0,0,255),INSERT_ARROW_POINTS),
+                               (REMOVE,(255,0,0),REMOVE_ARROW_POINTS)):
+            
+            rel_pointlist = [layout.point(point) 
+                             for point in design_pointlist]
+         
+            #bounds of the outline, the surface includes its edges
+            left = min(point[0] for point in rel_pointlist)
+            top = min(point[1] for point in rel_pointlist)
+            width = max(point[0] for point in rel_pointlist) - left + 1
+            height = max(point[1] for point in rel_pointlist) - top + 1
+            
+            arrow_surf = create_surface((width,height))
+            arrow_surf.fill(ARROW_COLORKEY)
+            arrow_surf.set_colorkey(ARROW_COLORKEY,pygame.RLEACCEL)
+            
+            pointlist = [(point[0]-left,point[1]-top) 
+                         for point in rel_pointlist]
+            pygame.draw.polygon(arrow_surf,color,pointlist)
+            
+            arrow_sprites[opcode] = (arrow_surf,(-left,-top))
+            
+         InstructionQueue._arrow_sprites[layout.scale] = arrow_sprites
          
-      pygame.draw.polygon(screen,arrow_color,pointlist)
+      return arrow_sprites
       
    #--------------------------------------------------------------------------
       
    def _create_data_surf(self,data):
    
-      data_surf = pygame.Surface((50,50))
+      cell_size = self.cell_size
+      data_surf = create_surface((self.data_size,self.data_size))
+      
+      #the encoded data is only turned into colours here
+      data = decode_data(data)
       
       for i in range(len(data)):
          
          #create local rect for data element
-         rect = pygame.Rect(((i%2)*25,(i/2)*25),(25,25))
+         rect = pygame.Rect(((i%2)*cell_size,(i/2)*cell_size),
+                            (cell_size,cell_size))
          
          #blit colour onto surf
          data_surf.fill(data[i],rect)
@@ -359,60 +616,78 @@ class InstructionQueue(GameObject,GameEventListener):
       return data_surf
                  
          
-class Instruction:
-   
-   def __init__(self,opcode,data):
-      self.opcode = opcode
-      self.data = data     
+##############################################################################
+# DATA ITEMS
+##############################################################################
+
+def decode_data(data):
+   """
+   Returns the colour of each cell of an encoded data item.
+   """
+   return DATA_ITEMS[data]
    
 
 ##############################################################################
 # GAME STATE CLASS
 ##############################################################################
 
-class GameState(State,SystemEventListener,GUIEventListener,GameEventListener):
+class GameState(State,SystemEventListener,GUIEventListener):
+   """
+   Plays a Simulation of the game, one step each tick, with the boxes as
+   its controls.  Shows the simulation's instruction queue, operations and
+   errors and moves to the high score state when the game is over.
+   """
 
-   def __init__(self, model):
+   def __init__(self, model, seed=None):
+      """
+      model - reference to the model
+      seed - seed for the simulation, by default taken from the global
+             random generator so that seeded sessions play out the same
+      """
    
-      SystemEventListener.__init__(self)
-      GUIEventListener.__init__(self)
-      GameEventListener.__init__(self)
+      SystemEventListener.__init__(self,(TickEvent,))
+      GUIEventListener.__init__(self,(ButtonClickedEvent,))
       State.__init__(self,model)
       
+      if seed is None:
+         seed = random.getrandbits(32)
+         
+      self.simulation = Simulation(seed)
+      
+      #scales the design positions to the screen the model is drawn on
+      self.layout = Layout(model.screen_size)
+      
       self.boxes = []
       self.dialogue = None
-      self.score = 0
-      self.min_data_in_boxes = INITIAL_MIN_DATA_IN_BOXES
-      
-      #data held in boxes { box_num : [data] }
-      self.box_data = dict()
       
       #create the boxes
-      for i in range(9):
+      for i in range(NUM_BOXES):
          
-         #NB - doesn't support multiple resolutions
-         box_topleft = (i%3)*(480/3)
-         box_topright = (i/3)*(480/3)
-         box_size = 480/3
+         box_left = (i%3)*BOX_SIZE
+         box_top = (i/3)*BOX_SIZE
          
-         box_rect = pygame.Rect(box_topleft,box_topright,box_size,box_size)
+         box_rect = self.layout.rect(pygame.Rect(box_left,box_top,
+                                                 BOX_SIZE,BOX_SIZE))
          
-         self.boxes.append(Box(i+1,box_rect))
-         self.box_data[i+1] = []
+         self.boxes.append(Box(i+1,box_rect,self.layout))
          
-      self.instruction_queue = InstructionQueue()
-         
-      #delay until next instruction
-      self.delay = INITIAL_DELAY
+      self.instruction_queue = InstructionQueue(self.layout)
       
-      #last delay (used to calculate next delay)
-      self.last_delay = INITIAL_DELAY
+      #simulation instructions that have been passed on to the queue
+      self.instructions_added = 0
+      self.instructions_completed = 0
       
-      #add the first instruction
-      self._add_new_instruction()
+      #objects drawn each tick, refilled in place by notify
+      self.visible_objects = []
       
-         
+      #posted every tick so that a new event isn't created each frame, the
+      #boxes only change on mouse over so they go in the background
+      self.model_updated_event = ModelUpdatedEvent(self.visible_objects,
+                                                   self.game_objects,
+                                                   self.boxes)
       
+      #show the first instruction
+      self._update_objects()
       
    #--------------------------------------------------------------------------
    
@@ -420,178 +695,70 @@ class GameState(State,SystemEventListener,GUIEventListener,GameEventListener):
    
       if isinstance(event,TickEvent):
       
-         #post game tick
-         GameEventManager.post(GameTick())
-         
-         #check if new instruction needs to be added
-         self.delay -= 1
+         self.simulation.step()
+         self._update_objects()
          
-         #check if instruction queue is empty
-         if len(self.instruction_queue.queue) is 0:
-            self.delay = 0
-         
-         if self.delay <= 0:
-            self._add_new_instruction()
-            self.delay = self.last_delay - DELAY_DECAY
-            self.last_delay = self.delay
-            
-            if self.delay < MIN_DELAY:
-               self.delay = MIN_DELAY
-               
-         if len(self.instruction_queue.queue) >= MAX_INSTRUCTIONS:
-            self.model.change_state(HighScoreState(self.model,self.score))
+         if self.simulation.game_over:
+            self.model.change_state(HighScoreState(self.model,
+                                                   self.simulation.score))
             return       
          
-         #create visible objects list         
-         visible_objects = []
-         
-         visible_objects += self.boxes
+         #refill visible objects list         
+         visible_objects = self.visible_objects
          
-         visible_objects.append(self.instruction_queue)
+         visible_objects[:] = (self.instruction_queue,)
          
          if self.dialogue is not None:
             visible_objects.append(self.dialogue)
       
-         SystemEventManager.post(ModelUpdatedEvent(visible_objects,
-                                                   self.game_objects))
+         SystemEventManager.post(self.model_updated_event)
                                
                                               
       if isinstance(event,ButtonClickedEvent):
       
-         #box click
+         #box click starts an operation unless one or an error is showing
          if isinstance(event.button, Box):
             
-            #start the operation
-            if self.dialogue is None:
-               box_num = event.button.num
-               operation_time = OPERATION_TIME * len(self.box_data[box_num])
-               self.dialogue = ProgressBar(operation_time,box_num)
-      
-      #after progress complete, check if operation was successful
-      if isinstance(event,ProgressComplete):
-         self.dialogue = None
-         
-         box_num = event.box_num
-         instruction = self.instruction_queue.get_next_instruction()
-         
-         if instruction is None:
-            return
-            
-         if instruction.opcode is INSERT:
-            
-            self.box_data[box_num].append(instruction.data)
-            
-         if instruction.opcode is REMOVE:
-         
-            #check data is in box and remove if so
-            if instruction.data in self.box_data[box_num]:
-               self.box_data[box_num].remove(instruction.data)
+            if self.simulation.apply_action(event.button.num):
+               self._update_objects()
                
-            else:
-               self.dialogue = ErrorMessage()
-               return                
-         
-         self.score += 1   
-         GameEventManager.post(InstructionSuccessful())
-         
-      #clear the dialogue on error complete
-      if isinstance(event,ErrorComplete):
-         self.dialogue = None
-         
    #--------------------------------------------------------------------------
    
-   def _data_exists(self, data):
+   def _update_objects(self):
       """
-      Returns True if the data exists in one of the boxes or the instruction
-      queue.
+      Brings the instruction queue and dialogue up to date with the
+      simulation.
       """
       
-      #check if data is in box data      
-      for box_num in self.box_data.keys():
-         if data in self.box_data[box_num]:
-            return True
-            
-      #check if data is in instruction queue data
-      for instruction in self.instruction_queue.queue:
-         if data == instruction.data:
-            return True
-            
-      return False
+      simulation = self.simulation
       
-   #--------------------------------------------------------------------------
-   
-   def _new_data(self):
-      """
-      Creates a data item that does not already exist in the instuction
-      queue or boxes.
-      """
-   
-      data = None
-       
-      while True:
+      #instructions are carried out from the front of the queue before new
+      #ones are added to the back
+      while self.instructions_completed < simulation.instructions_completed:
+         GameEventManager.post(InstructionSuccessful())
+         self.instructions_completed += 1
          
-         data = (random.choice(DATA_COLORS),random.choice(DATA_COLORS),
-                random.choice(DATA_COLORS),random.choice(DATA_COLORS))
-                
-         if not self._data_exists(data):
-            break
-            
-      return data
-      
-   #--------------------------------------------------------------------------
-   
-   def _all_box_data(self):
-      """
-      Returns a list holding all data items held in the boxes.
-      """
-      
-      all_data = []
+      new_instructions = simulation.instructions_added - \
+                         self.instructions_added
+                         
+      if new_instructions > 0:
       
-      for box_num in self.box_data.keys():
-         all_data += self.box_data[box_num]
+         for instruction in simulation.queue[-new_instructions:]:
+            GameEventManager.post(InstructionAdded(instruction))
+            
+         self.instructions_added = simulation.instructions_added
          
-      return all_data
-      
-   #--------------------------------------------------------------------------
-   
-   def _add_new_instruction(self):
-      """
-      Adds a new instruction to the instruction queue.
-      """ 
-      
-      all_data = self._all_box_data()
-      
-      opcode = None
-      
-      #decide if we want an insert or remove instruction      
-      if len(all_data) < self.min_data_in_boxes:
-         opcode = INSERT
-      else:
-         opcode = random.choice((INSERT,REMOVE))     
+      #show the operation in progress or error, if any
+      if simulation.operation is not None:
       
+         if not isinstance(self.dialogue,ProgressBar) or \
+            self.dialogue.operation is not simulation.operation:
+            self.dialogue = ProgressBar(simulation.operation,self.layout)
             
-      data = None
+      elif simulation.error_frames > 0:
       
-      #if insert op - create new data
-      if opcode is INSERT:
-         data = self._new_data()
-      
-      #if remove op - select existing data
-      if opcode is REMOVE:
-      
-         while True:
-         
-            data = random.choice(all_data)
+         if not isinstance(self.dialogue,ErrorMessage):
+            self.dialogue = ErrorMessage(self.layout)
             
-            #check that data is not already in instruction queue
-            for instruction in self.instruction_queue.queue:
-               if data == instruction.data:
-                  continue
-            break
-            
-       
-      instruction = Instruction(opcode,data)  
-      GameEventManager.post(InstructionAdded(instruction))
-         
-               
-   
\ No newline at end of file
+      else:
+         self.dialogue = None
@@ -11,6 +11,8 @@ import pygame
 from engine.events import *
 from engine.systemevents import *
 from engine.model import GameObject
+from engine.fontcache import FONT_CACHE
+from engine.surfacefactory import create_surface, to_display_format
 from weakref import WeakKeyDictionary 
 
 ##############################################################################
@@ -22,6 +24,8 @@ class ButtonClickedEvent(Event):
    Posted by a button when it is clicked.
    """
    
+   __slots__ = ("button",)
+   
    def __init__(self,button):
       """
       button - reference to the button that was clicked
@@ -41,12 +45,14 @@ class GUIEventManager(EventManager):
 
 class GUIEventListener(Listener):
    
-   def __init__(self):
+   def __init__(self,event_types=(Event,)):
       """
       Creates a System Event Listener that will register itself with the
       GUI Event Manager.
+      
+      event_types - GUI event classes this listener is notified of
       """
-      Listener.__init__(self,GUIEventManager)  
+      Listener.__init__(self,GUIEventManager,event_types)  
    
 ##############################################################################
 # COMPONENTS - IMAGE
@@ -62,8 +68,34 @@ class Image(GameObject):
       self.rect = rect
       self.surf = surf
       
+      #increased when the surf or rect are replaced by a subclass
+      self.version = 0
+      
+      #surf and rect as of the last get_dirty_rects call
+      self._drawn_surf = None
+      self._drawn_rect = None
+      
    def render(self,screen):
       screen.blit(self.surf,self.rect)
+      
+   def get_version(self):
+      return self.version
+      
+   def get_dirty_rects(self):
+   
+      if self.surf is self._drawn_surf and self.rect == self._drawn_rect:
+         return ()
+         
+      dirty_rects = [self.rect.copy()]
+      
+      #clear the old position too if the image has moved
+      if self._drawn_rect is not None and self._drawn_rect != self.rect:
+         dirty_rects.append(self._drawn_rect)
+         
+      self._drawn_surf = self.surf
+      self._drawn_rect = self.rect.copy()
+      
+      return dirty_rects
 
 ##############################################################################
 # COMPONENTS - BUTTON
@@ -77,7 +109,7 @@ class Button(Image,SystemEventListener):
 
    def __init__(self,rect,normal_surf, mouse_over_surf=None):
    
-      SystemEventListener.__init__(self)
+      SystemEventListener.__init__(self,(MouseMotionEvent,MouseButtonEvent))
       Image.__init__(self,rect,normal_surf)
    
       self.normal_surf = normal_surf
@@ -96,9 +128,13 @@ class Button(Image,SystemEventListener):
             
          #check for collision
          if self.rect.collidepoint(event.pos):
-            self.surf = self.mouse_over_surf
+            surf = self.mouse_over_surf
          else:
-            self.surf = self.normal_surf
+            surf = self.normal_surf
+            
+         if surf is not self.surf:
+            self.surf = surf
+            self.version += 1
             
       #check for mouse click
       if isinstance(event,MouseButtonEvent):
@@ -125,8 +161,9 @@ class Text(Image):
       colour - the colour the text should be drawn
       """
       
-      text_surf = pygame.font.SysFont("courier",fontsize,True).\
+      text_surf = FONT_CACHE.get("courier",fontsize,True).\
                                                      render(text,True,color)
+      text_surf = to_display_format(text_surf)
                                                      
       text_rect = pygame.Rect(topleft,(text_surf.get_width(),
                                        text_surf.get_height()))
@@ -146,7 +183,7 @@ class TextInputBox(Image,SystemEventListener):
    def __init__(self,topleft,width,initial_text,fg_color,bg_color,fontsize,
                 border_width=2):
                 
-      SystemEventListener.__init__(self)
+      SystemEventListener.__init__(self,(MouseButtonEvent,KeyboardEvent))
                 
       #text to be displayed in the box
       self.text = initial_text
@@ -167,14 +204,23 @@ class TextInputBox(Image,SystemEventListener):
       #flag used to record the first click so that initial text is deleted
       self._first_focus = True
       
-      #time until the next cursor flash
-      self._cursor_flash_time = 0
+      #time in ms that the cursor flashing started from
+      self._cursor_flash_start = 0
       
       #whether or not the cursor should be drawn
       self._cursor_toggle = True
       
-      #number of frames between each cursor flash
-      self._FRAMES_BETWEEN_FLASHES = 30
+      #(text, cursor shown, area covered) as of the last get_dirty_rects
+      self._drawn_state = None
+      
+      #surface of the text and the text it shows, only re-rendered when
+      #the text changes
+      self._text_surf = None
+      self._rendered_text = None
+      
+      #number of ms between each cursor flash.  Timed by the clock rather
+      #than by frames so that it works when the game loop is idle.
+      self._MS_BETWEEN_FLASHES = 500
       
       #width of cursor
       self._CURSOR_WIDTH = 3
@@ -201,14 +247,18 @@ class TextInputBox(Image,SystemEventListener):
             
             if self.rect.collidepoint(event.pos):
             
+               self._mark_changed()
+               
                self.has_focus = True
+               self._cursor_flash_start = pygame.time.get_ticks()
             
                #erase initial text on first focus
                if self._first_focus:
                   self.text = ""
                   self._first_focus = False
             
-            else:
+            elif self.has_focus:
+               self._mark_changed()
                self.has_focus = False
                
       if isinstance(event,KeyboardEvent):
@@ -219,6 +269,10 @@ class TextInputBox(Image,SystemEventListener):
          if event.type is not pygame.KEYDOWN:
             return
          
+         #keep the cursor visible while typing
+         self._mark_changed()
+         self._cursor_flash_start = pygame.time.get_ticks()
+         
          if event.key is pygame.K_BACKSPACE or event.key is pygame.K_DELETE:
             self.text = self.text[:-1]
             return   
@@ -234,8 +288,13 @@ class TextInputBox(Image,SystemEventListener):
    def render(self,screen):
       Image.render(self,screen)
       
-      text_surf = pygame.font.SysFont("courier",self.fontsize,True).\
-                                 render(self.text,True,self.fg_color)
+      if self.text != self._rendered_text:
+         text_surf = FONT_CACHE.get("courier",self.fontsize,True).\
+                                    render(self.text,True,self.fg_color)
+         self._text_surf = to_display_format(text_surf)
+         self._rendered_text = self.text
+         
+      text_surf = self._text_surf
                            
       #where to draw the text
       text_rect = self.rect.inflate(-1*self.border_width,-1*self.border_width)
@@ -246,26 +305,114 @@ class TextInputBox(Image,SystemEventListener):
                                  
       screen.blit(text_surf,text_rect)
       
-      #create the cursor
+      #position the cursor
       cursor_height = self.rect.height-(self.border_width*2)-4
-      cursor_surf = pygame.Surface((self._CURSOR_WIDTH, cursor_height))
-      cursor_surf.fill(self.fg_color)
       
       cursor_x = text_rect.right+self._CURSOR_WIDTH
       cursor_y = text_rect.top+2
       cursor_rect = pygame.Rect(cursor_x,cursor_y,
                                 self._CURSOR_WIDTH,cursor_height)
       
-      #check if the flash timer has elapsed and draw cursor if so
+      self._cursor_toggle = self._cursor_flash_on()
+      
+      #draw the cursor if it is toggled on
       if self._cursor_toggle and self.has_focus:                          
-         screen.blit(cursor_surf,cursor_rect)
-      
-      #update the cursor flash timer and toggle   
-      if self._cursor_flash_time <= 0:
-         self._cursor_toggle = not self._cursor_toggle
-         self._cursor_flash_time = self._FRAMES_BETWEEN_FLASHES
-      else:
-         self._cursor_flash_time -= 1
+         screen.fill(self.fg_color,cursor_rect)
+                                  
+   #--------------------------------------------------------------------------
+   
+   def get_version(self):
+   
+      #each flash of the cursor is a change while the box has focus
+      if self.has_focus:
+         return self.version + self._cursor_flashes()
+         
+      return self.version
+      
+   #--------------------------------------------------------------------------
+   
+   def get_dirty_rects(self):
+   
+      extent = self._get_extent()
+      state = (self.text,self.has_focus and self._cursor_flash_on(),extent)
+      
+      if state == self._drawn_state:
+         return ()
+         
+      dirty_rects = [extent]
+      
+      #clear any longer text that was there before
+      if self._drawn_state is not None:
+         dirty_rects.append(self._drawn_state[2])
+      
+      self._drawn_state = state
+      
+      return dirty_rects
+      
+   #--------------------------------------------------------------------------
+   
+   def time_until_flash(self):
+      """
+      Returns the number of seconds until the cursor next flashes, or None
+      if the box doesn't have focus so no cursor is shown.
+      """
+      
+      if not self.has_focus:
+         return None
+         
+      elapsed = pygame.time.get_ticks() - self._cursor_flash_start
+      
+      return (self._MS_BETWEEN_FLASHES - 
+              elapsed % self._MS_BETWEEN_FLASHES) / 1000.0
+              
+   #--------------------------------------------------------------------------
+   
+   def _cursor_flash_on(self):
+      """
+      Returns True if the cursor is in the visible half of its flash.
+      """
+      return self._cursor_flashes() % 2 == 0
+      
+   #--------------------------------------------------------------------------
+   
+   def _cursor_flashes(self):
+      """
+      Returns the number of times the cursor has flashed on or off since
+      the flashing last restarted.
+      """
+      return (pygame.time.get_ticks() - self._cursor_flash_start) // \
+             self._MS_BETWEEN_FLASHES
+             
+   #--------------------------------------------------------------------------
+   
+   def _mark_changed(self):
+      """
+      Increases the version.  Called before the flashing restarts or stops,
+      the flashes so far are included so that the version keeps going up.
+      """
+      self.version += self._cursor_flashes() + 1
+      
+   #--------------------------------------------------------------------------
+   
+   def _get_extent(self):
+      """
+      Returns the screen area covered by the box, its text and the cursor.
+      Long text can run past the right hand side of the box.
+      """
+      
+      text_width = FONT_CACHE.get("courier",self.fontsize,True).\
+                                             size(self.text)[0]
+                                             
+      #matches the text and cursor positions used by render
+      right = self.rect.left + self.border_width/2 + 4 + text_width + \
+              self._CURSOR_WIDTH*2
+              
+      extent = self.rect.copy()
+      
+      if right > extent.right:
+         extent.width = right - extent.left
+         
+      return extent
                                   
    #--------------------------------------------------------------------------
       
@@ -275,11 +422,11 @@ class TextInputBox(Image,SystemEventListener):
       """
       
       #calculate the height based on fontsize
-      test_text = pygame.font.SysFont("courier",fontsize,True).\
+      test_text = FONT_CACHE.get("courier",fontsize,True).\
                                           render("AyQ!",True,(0,0,0))
       height = test_text.get_height()+(border_width*2)
       
-      box_surf = pygame.Surface((width,height))
+      box_surf = create_surface((width,height))
       
       #fill in the foreground colour
       box_surf.fill(fg_color)      
@@ -14,9 +14,11 @@ from gui import *
 
 from engine.model import State
 from engine.systemevents import *
+from engine.surfacefactory import create_surface
 
 from gameoverstate import GameOverState
 from gui import *
+from layout import Layout
 
 ##############################################################################
 # CONSTANTS
@@ -26,10 +28,15 @@ HIGH_SCORE_FILE = os.path.join("data","high_score.txt")
 SCORE_DELIMITER = "|"
 BLANK_SCORE = ("nobody",0)
 
+#positions and sizes are given for the design screen size (see layout.py)
+
+CENTER_X = 320
 TITLE_Y = 50
 PROMPT_Y = 200
 TB_INITIAL_TEXT = "Type your name here"
 TEXT_BOX_Y = 250
+TEXT_BOX_WIDTH = 400
+TEXT_BOX_BORDER = 2
 ACCEPT_BUTTON_SIZE = (150,60)
 ACCEPT_FONT_SIZE = 20
 ACCEPT_BUTTON_Y = 330
@@ -51,22 +58,38 @@ class HighScoreState(State,GUIEventListener,SystemEventListener):
       self.new_score = score
       self.old_high_score = self._read_high_score()
          
-      GUIEventListener.__init__(self)
-      SystemEventListener.__init__(self)
+      GUIEventListener.__init__(self,(ButtonClickedEvent,))
+      SystemEventListener.__init__(self,(TickEvent,))
+      
+      self.layout = Layout(model.screen_size)
+      layout = self.layout
          
-      self.title = Text((0,0),"!!!NEW HIGH SCORE!!!",(255,0,0),50)
-      self.title.rect.center = (320,TITLE_Y)
+      self.title = Text((0,0),"!!!NEW HIGH SCORE!!!",(255,0,0),
+                        layout.size(50))
+      self.title.rect.center = layout.point((CENTER_X,TITLE_Y))
          
          
-      self.prompt = Text((0,0),"Enter your name:",(255,255,255),25)
-      self.prompt.rect.center = (320,PROMPT_Y)
+      self.prompt = Text((0,0),"Enter your name:",(255,255,255),
+                         layout.size(25))
+      self.prompt.rect.center = layout.point((CENTER_X,PROMPT_Y))
       
-      self.text_box = TextInputBox((0,0),400,TB_INITIAL_TEXT,
-                                   (255,255,255),(0,0,0),20)
-      self.text_box.rect.center = (320,TEXT_BOX_Y)
+      self.text_box = TextInputBox((0,0),layout.size(TEXT_BOX_WIDTH),
+                                   TB_INITIAL_TEXT,(255,255,255),(0,0,0),
+                                   layout.size(20),
+                                   max(layout.size(TEXT_BOX_BORDER),1))
+      self.text_box.rect.center = layout.point((CENTER_X,TEXT_BOX_Y))
       
       self.accept_button = self._create_accept_button()
-      self.accept_button.rect.center = (320,ACCEPT_BUTTON_Y)  
+      self.accept_button.rect.center = layout.point((CENTER_X,
+                                                     ACCEPT_BUTTON_Y))
+      
+      #the same objects are drawn every tick so build the event once
+      visible_objects = [self.title,self.prompt,self.text_box,
+                         self.accept_button]
+      self.model_updated_event = ModelUpdatedEvent(visible_objects,[])
+      
+      #the screen only changes on input or when the cursor flashes
+      self.idle_event = IdleEvent()
                                  
                                    
       
@@ -85,13 +108,10 @@ class HighScoreState(State,GUIEventListener,SystemEventListener):
                                 self.old_high_score))
             return
       
-         visible_objects = []
-         visible_objects.append(self.title)
-         visible_objects.append(self.prompt)
-         visible_objects.append(self.text_box)
-         visible_objects.append(self.accept_button)
+         SystemEventManager.post(self.model_updated_event)
          
-         SystemEventManager.post(ModelUpdatedEvent(visible_objects,[]))
+         self.idle_event.timeout = self.text_box.time_until_flash()
+         SystemEventManager.post(self.idle_event)
          
       if isinstance(event,ButtonClickedEvent) and \
          event.button is self.accept_button:
@@ -149,14 +169,17 @@ class HighScoreState(State,GUIEventListener,SystemEventListener):
    
    def _create_accept_button(self):
    
-      text = Text((0,0),"Accept",(0,0,0),ACCEPT_FONT_SIZE)
+      text = Text((0,0),"Accept",(0,0,0),
+                  self.layout.size(ACCEPT_FONT_SIZE))
+      
+      button_size = self.layout.point(ACCEPT_BUTTON_SIZE)
    
-      normal_surf = pygame.Surface(ACCEPT_BUTTON_SIZE)
+      normal_surf = create_surface(button_size)
       normal_surf.fill((0,255,0))
       text.rect.center = normal_surf.get_rect().center
       normal_surf.blit(text.surf,text.rect)
       
-      mo_surf = pygame.Surface(ACCEPT_BUTTON_SIZE)
+      mo_surf = create_surface(button_size)
       mo_surf.fill((0,255,255))
       mo_surf.blit(text.surf,text.rect)
       
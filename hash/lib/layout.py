@@ -0,0 +1,63 @@
+##############################################################################
+# layout.py
+##############################################################################
+# Positions and sizes in the game are given for the 640x480 screen it was
+# designed for.  A layout scales them to the size of the screen the model
+# is actually drawn on, so the game can be rendered at a lower resolution
+# on slow machines or a higher one on fast machines.
+##############################################################################
+# 10/26 - GoshDarnGames
+##############################################################################
+
+import pygame
+
+##############################################################################
+# CONSTANTS
+##############################################################################
+
+#screen size the layout constants are given for
+DESIGN_SIZE = (640,480)
+
+##############################################################################
+# LAYOUT
+##############################################################################
+
+class Layout:
+   """
+   Scales design positions and sizes to a screen size.  Both axes are
+   scaled by the same amount so screens with a different shape to the
+   design have a border on the right or bottom.
+   """
+   
+   def __init__(self,screen_size):
+      
+      self.screen_size = screen_size
+      
+      self.scale = min(float(screen_size[0]) / DESIGN_SIZE[0],
+                       float(screen_size[1]) / DESIGN_SIZE[1])
+   
+   #--------------------------------------------------------------------------
+   
+   def size(self,value):
+      """
+      Scales a design length, coordinate or font size to whole pixels.
+      """
+      return int(round(value * self.scale))
+   
+   #--------------------------------------------------------------------------
+   
+   def point(self,point):
+      return (self.size(point[0]),self.size(point[1]))
+   
+   #--------------------------------------------------------------------------
+   
+   def rect(self,rect):
+      """
+      Scales a design rect.  The edges are scaled rather than the size so
+      that rects which touch in the design still touch.
+      """
+      
+      left,top = self.point(rect.topleft)
+      right,bottom = self.point(rect.bottomright)
+      
+      return pygame.Rect(left,top,right-left,bottom-top)
@@ -0,0 +1,484 @@
+##############################################################################
+# simulation.py
+##############################################################################
+# The rules of the game with nothing drawn: instructions are generated,
+# the player's operations on the boxes are timed and carried out, wrong
+# removes are penalised and the score is kept until the queue fills up.
+#
+# Doesn't use pygame, the event managers or the global random generator,
+# so games can be simulated as fast as possible and replayed from their
+# seed.  The game state drives one of these and shows what it does.
+##############################################################################
+# 10/26 - GoshDarnGames
+##############################################################################
+
+import random
+
+##############################################################################
+# CONSTANTS
+##############################################################################
+
+#OP-CODES
+INSERT = 1
+REMOVE = 2
+
+#boxes are numbered from 1
+NUM_BOXES = 9
+
+#number of frames for an operation (i.e. frames = num_data * operation_time)
+OPERATION_TIME = 30
+
+#frames the boxes can't be used for after a remove from the wrong box
+ERROR_TIME = 120
+
+#INSTRUCTION QUEUE CONSTANTS
+MAX_INSTRUCTIONS = 7
+INITIAL_DELAY = 900
+DELAY_DECAY = 10
+MIN_DELAY = 180
+
+#DATA CONSTANTS
+INITIAL_MIN_DATA_IN_BOXES = 8
+
+#data items are encoded as integers, each cell's colour index being one
+#base NUM_COLORS digit with the first cell the most significant
+NUM_COLORS = 6
+DATA_CELLS = 4
+NUM_DATA = NUM_COLORS**DATA_CELLS
+
+#random data items tried before a new one is picked from the unused items
+MAX_NEW_DATA_TRIES = 16
+
+##############################################################################
+# INSTRUCTIONS AND OPERATIONS
+##############################################################################
+
+class Instruction:
+   
+   def __init__(self,opcode,data):
+      self.opcode = opcode
+      self.data = data
+
+
+class Operation:
+   """
+   The player working on a box.  It finishes when frames_left reaches 0.
+   """
+   __slots__ = ("box_num","frames","frames_left")
+   
+   def __init__(self,box_num,frames):
+      self.box_num = box_num
+      self.frames = frames
+      self.frames_left = frames
+
+
+##############################################################################
+# DATA ITEMS
+##############################################################################
+
+class DataSet:
+   """
+   Set of encoded data items, such as those held by a box, stored as one
+   byte for every possible item so that adding, removing and checking
+   for an item take constant time.
+   """
+   
+   def __init__(self):
+      
+      self.flags = bytearray(NUM_DATA)
+      self.count = 0
+   
+   #--------------------------------------------------------------------------
+   
+   def __len__(self):
+      return self.count
+   
+   #--------------------------------------------------------------------------
+   
+   def __contains__(self,data):
+      return self.flags[data] != 0
+   
+   #--------------------------------------------------------------------------
+   
+   def add(self,data):
+      
+      if not self.flags[data]:
+         self.flags[data] = 1
+         self.count += 1
+   
+   #--------------------------------------------------------------------------
+   
+   def remove(self,data):
+      
+      if not self.flags[data]:
+         raise KeyError(data)
+      
+      self.flags[data] = 0
+      self.count -= 1
+
+
+##############################################################################
+# CANDIDATE POOL
+##############################################################################
+
+class CandidatePool:
+   """
+   Set of items that can be added, removed and picked from at random in
+   constant time.  Items are kept in a list along with the position of
+   each; removing an item moves the last one into its place.
+   """
+   
+   def __init__(self,rng):
+      """
+      rng - random.Random that items are picked with
+      """
+      
+      self.rng = rng
+      
+      self.items = []
+      
+      #{ item : index in items }
+      self.positions = dict()
+   
+   #--------------------------------------------------------------------------
+   
+   def __len__(self):
+      return len(self.items)
+   
+   #--------------------------------------------------------------------------
+   
+   def __contains__(self,item):
+      return item in self.positions
+   
+   #--------------------------------------------------------------------------
+   
+   def add(self,item):
+      
+      if item in self.positions:
+         return
+      
+      self.positions[item] = len(self.items)
+      self.items.append(item)
+   
+   #--------------------------------------------------------------------------
+   
+   def remove(self,item):
+      
+      idx = self.positions.pop(item)
+      last_item = self.items.pop()
+      
+      #fill the gap with the last item unless it was the one removed
+      if idx < len(self.items):
+         self.items[idx] = last_item
+         self.positions[last_item] = idx
+   
+   #--------------------------------------------------------------------------
+   
+   def choice(self):
+      """
+      Returns a random item from the pool, which must not be empty.
+      """
+      return self.rng.choice(self.items)
+
+
+##############################################################################
+# SIMULATION
+##############################################################################
+
+class Simulation:
+   """
+   One game.  Each call to step advances it by frames, and apply_action
+   starts an operation on a box as the player clicking it would.  Games
+   with the same seed and actions on the same frames play out the same.
+   """
+   
+   def __init__(self,seed=None):
+      """
+      seed - seed for the game's random generator, from the clock if None
+      """
+      
+      self.seed = seed
+      self.random = random.Random(seed)
+      
+      #frames stepped so far
+      self.frame = 0
+      
+      self.score = 0
+      self.game_over = False
+      self.min_data_in_boxes = INITIAL_MIN_DATA_IN_BOXES
+      
+      #instructions waiting to be carried out, the next one first
+      self.queue = []
+      
+      #number of instructions ever added to and carried out from the queue,
+      #so that whoever shows the queue can tell what changed in a step
+      self.instructions_added = 0
+      self.instructions_completed = 0
+      
+      #operation in progress, if any
+      self.operation = None
+      
+      #frames left before the boxes can be used after a wrong remove
+      self.error_frames = 0
+      
+      #data held in boxes { box_num : DataSet }
+      self.box_data = dict()
+      
+      for box_num in range(1,NUM_BOXES+1):
+         self.box_data[box_num] = DataSet()
+      
+      #every data item in a box or the instruction queue and the box it is
+      #in, None until its insert succeeds.  Updated as instructions are
+      #added and carried out { data : box_num }
+      self.live_data = dict()
+      
+      #number of data items held in all the boxes
+      self.num_box_data = 0
+      
+      #data in the boxes that no queued remove instruction is for, remove
+      #instructions are only made for these
+      self.removable_data = CandidatePool(self.random)
+      
+      #delay until next instruction
+      self.delay = INITIAL_DELAY
+      
+      #last delay (used to calculate next delay)
+      self.last_delay = INITIAL_DELAY
+      
+      #add the first instruction
+      self._add_new_instruction()
+   
+   #--------------------------------------------------------------------------
+   
+   def apply_action(self,box_num):
+      """
+      Starts an operation on a box for the next instruction.  Returns False
+      and does nothing if the game is over or the boxes are busy with an
+      operation or an error.
+      """
+      
+      if self.game_over or self.operation is not None or \
+         self.error_frames > 0:
+         return False
+      
+      operation_time = OPERATION_TIME * len(self.box_data[box_num])
+      self.operation = Operation(box_num,operation_time)
+      
+      return True
+   
+   #--------------------------------------------------------------------------
+   
+   def step(self,frames=1):
+      """
+      Advances the game by frames, stopping early if the game ends.  Frames
+      in which only countdowns change are skipped over together.
+      """
+      
+      while frames > 0 and not self.game_over:
+         
+         #count down the frames before the next thing happens in one go
+         idle_frames = min(frames,self.frames_until_event()) - 1
+         
+         if idle_frames > 0:
+            self._count_down(idle_frames)
+            frames -= idle_frames
+         
+         self._step_frame()
+         frames -= 1
+   
+   #--------------------------------------------------------------------------
+   
+   def frames_until_event(self):
+      """
+      Returns the number of frames until one in which an operation or error
+      finishes or an instruction is added, counting that frame.  Stepping
+      fewer frames leaves nothing new for the player to act on.
+      """
+      
+      #an instruction is added as soon as the queue is empty
+      if len(self.queue) == 0:
+         return 1
+      
+      frames = max(self.delay,1)
+      
+      if self.operation is not None:
+         frames = min(frames,max(self.operation.frames_left,1))
+      
+      if self.error_frames > 0:
+         frames = min(frames,self.error_frames)
+      
+      return frames
+   
+   #--------------------------------------------------------------------------
+   
+   def _count_down(self,frames):
+      """
+      Advances the countdowns by frames, which must be fewer than
+      frames_until_event.
+      """
+      
+      self.frame += frames
+      self.delay -= frames
+      
+      if self.operation is not None:
+         self.operation.frames_left -= frames
+      
+      if self.error_frames > 0:
+         self.error_frames -= frames
+   
+   #--------------------------------------------------------------------------
+   
+   def _step_frame(self):
+      
+      self.frame += 1
+      
+      #progress the operation or error
+      if self.operation is not None:
+         self.operation.frames_left -= 1
+         
+         if self.operation.frames_left <= 0:
+            self._complete_operation()
+      
+      elif self.error_frames > 0:
+         self.error_frames -= 1
+      
+      #check if new instruction needs to be added
+      self.delay -= 1
+      
+      #check if instruction queue is empty
+      if len(self.queue) == 0:
+         self.delay = 0
+      
+      if self.delay <= 0:
+         self._add_new_instruction()
+         self.delay = self.last_delay - DELAY_DECAY
+         self.last_delay = self.delay
+         
+         if self.delay < MIN_DELAY:
+            self.delay = MIN_DELAY
+      
+      if len(self.queue) >= MAX_INSTRUCTIONS:
+         self.game_over = True
+   
+   #--------------------------------------------------------------------------
+   
+   def _complete_operation(self):
+      """
+      Carries out the next instruction on the box the finished operation
+      was for.
+      """
+      
+      box_num = self.operation.box_num
+      self.operation = None
+      
+      if len(self.queue) == 0:
+         return
+      
+      instruction = self.queue[0]
+      
+      if instruction.opcode is INSERT:
+         
+         self.box_data[box_num].add(instruction.data)
+         
+         self.live_data[instruction.data] = box_num
+         self.num_box_data += 1
+         self.removable_data.add(instruction.data)
+      
+      if instruction.opcode is REMOVE:
+         
+         #check data is in box and remove if so
+         if instruction.data in self.box_data[box_num]:
+            self.box_data[box_num].remove(instruction.data)
+            
+            del self.live_data[instruction.data]
+            self.num_box_data -= 1
+         
+         else:
+            self.error_frames = ERROR_TIME
+            return
+      
+      del self.queue[0]
+      self.instructions_completed += 1
+      self.score += 1
+   
+   #--------------------------------------------------------------------------
+   
+   def _data_exists(self, data):
+      """
+      Returns True if the data exists in one of the boxes or the instruction
+      queue.
+      """
+      
+      return data in self.live_data
+   
+   #--------------------------------------------------------------------------
+   
+   def _new_data(self):
+      """
+      Creates a data item that does not already exist in the instuction
+      queue or boxes, or returns None if every data item exists.
+      """
+      
+      rng = self.random
+      
+      #random items are almost always unused, only when most items are live
+      #is it quicker to pick from the unused ones
+      for attempt in xrange(MAX_NEW_DATA_TRIES):
+         
+         #a random colour for each cell
+         data = 0
+         for cell in xrange(DATA_CELLS):
+            data = data*NUM_COLORS + rng.randrange(NUM_COLORS)
+         
+         if not self._data_exists(data):
+            return data
+      
+      unused_data = [data for data in xrange(NUM_DATA)
+                     if not self._data_exists(data)]
+      
+      if len(unused_data) == 0:
+         return None
+      
+      return rng.choice(unused_data)
+   
+   #--------------------------------------------------------------------------
+   
+   def _add_new_instruction(self):
+      """
+      Adds a new instruction to the instruction queue.
+      """
+      
+      opcode = None
+      
+      #decide if we want an insert or remove instruction
+      if self.num_box_data < self.min_data_in_boxes:
+         opcode = INSERT
+      else:
+         opcode = self.random.choice((INSERT,REMOVE))
+      
+      #all the data in the boxes may already be queued for removal
+      if opcode is REMOVE and len(self.removable_data) == 0:
+         opcode = INSERT
+      
+      
+      data = None
+      
+      #if insert op - create new data
+      if opcode is INSERT:
+         data = self._new_data()
+         
+         #every data item is live, so there must be some to remove
+         if data is None:
+            opcode = REMOVE
+         else:
+            self.live_data[data] = None
+      
+      #if remove op - select data in a box that isn't already being removed
+      if opcode is REMOVE:
+         
+         data = self.removable_data.choice()
+         
+         self.removable_data.remove(data)
+      
+      self.queue.append(Instruction(opcode,data))
+      self.instructions_added += 1
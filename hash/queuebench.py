@@ -0,0 +1,122 @@
+##############################################################################
+# queuebench.py
+##############################################################################
+# Compares the two ways the instruction queue can draw its data: one NumPy
+# array written to the surface in a single call, or a blit of each data
+# item's cached sprite (built with a fill per colour cell).
+# Checks that both give the same pixels and prints the time each takes to
+# draw a full queue.
+##############################################################################
+# 10/26 - GoshDarnGames
+##############################################################################
+
+import os
+import random
+import argparse
+from timeit import default_timer
+
+#the dummy driver has to be selected before pygame starts
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+import pygame
+
+from lib.engine.rendertarget import SurfaceTarget
+from lib.engine.surfacefactory import set_format_surface
+from lib import gamestate
+from lib.gamestate import InstructionQueue, Instruction
+from lib.layout import Layout
+
+from hash import GAME_NAME, SCREEN_SIZE
+
+##############################################################################
+# CONSTANTS
+##############################################################################
+
+DEFAULT_REPEATS = 2000
+
+##############################################################################
+# BENCHMARK
+##############################################################################
+
+def time_data_column(queue,repeats):
+   """
+   Returns the mean milliseconds taken to draw the queue's data column and
+   the surface it was drawn on.
+   """
+   
+   start = default_timer()
+   
+   for repeat in xrange(repeats):
+      queue._draw_data_column()
+   
+   elapsed = default_timer() - start
+   
+   return elapsed * 1000.0 / repeats, queue._data_column
+
+#-----------------------------------------------------------------------------
+
+def random_queue(use_numpy,length):
+   """
+   Returns an instruction queue holding length random instructions.
+   """
+   
+   queue = InstructionQueue(Layout(SCREEN_SIZE))
+   queue.use_numpy = use_numpy
+   
+   for idx in range(length):
+      data = random.randrange(gamestate.NUM_DATA)
+      opcode = random.choice((gamestate.INSERT,gamestate.REMOVE))
+      queue.queue.append(Instruction(opcode,data))
+   
+   return queue
+
+##############################################################################
+# MAIN EXECUTION
+##############################################################################
+
+if __name__ == "__main__":
+   
+   parser = argparse.ArgumentParser(description=GAME_NAME+
+                                    " (instruction queue benchmark)")
+   parser.add_argument("--repeats",type=int,default=DEFAULT_REPEATS,
+                       help="times to draw each queue "
+                            "(default %(default)s)")
+   parser.add_argument("--seed",type=int,default=0,
+                       help="random seed (default %(default)s)")
+   args = parser.parse_args()
+   
+   pygame.init()
+   
+   #draw in the same 32 bit format as the offscreen renderer
+   target = SurfaceTarget(SCREEN_SIZE)
+   set_format_surface(target.surface)
+   
+   if gamestate.numpy is None:
+      print "NumPy isn't installed, only the sprite path can be timed"
+   
+   print "%-12s %12s %12s" % ("instructions","numpy ms","sprites ms")
+   
+   for length in range(1,gamestate.MAX_INSTRUCTIONS+1):
+      
+      random.seed(args.seed + length)
+      numpy_queue = random_queue(True,length)
+      
+      random.seed(args.seed + length)
+      sprite_queue = random_queue(False,length)
+      
+      sprite_ms,sprite_column = time_data_column(sprite_queue,args.repeats)
+      
+      if gamestate.numpy is None:
+         print "%-12d %12s %12.4f" % (length,"-",sprite_ms)
+         continue
+      
+      numpy_ms,numpy_column = time_data_column(numpy_queue,args.repeats)
+      
+      if pygame.image.tostring(numpy_column,"RGB") != \
+         pygame.image.tostring(sprite_column,"RGB"):
+         raise AssertionError("NumPy and sprite paths drew different data "
+                              "for %d instructions" % length)
+      
+      print "%-12d %12.4f %12.4f" % (length,numpy_ms,sprite_ms)
+   
+   pygame.quit()
@@ -0,0 +1,118 @@
+##############################################################################
+# simulate.py
+##############################################################################
+# Plays games with the simulation alone, no pygame, and prints how many
+# games were played per second along with the scores reached.  The player
+# is a simple bot: it starts an operation as soon as the boxes are free,
+# inserts into the emptiest box and removes from the right box except for
+# a given share of mistakes.  Each game is reproducible from its seed.
+##############################################################################
+# 10/26 - GoshDarnGames
+##############################################################################
+
+import random
+import argparse
+from timeit import default_timer
+
+from lib.simulation import Simulation, INSERT, NUM_BOXES
+
+##############################################################################
+# CONSTANTS
+##############################################################################
+
+DEFAULT_GAMES = 1000
+
+#longest a game is played for, the bot can play some seeds forever
+DEFAULT_MAX_FRAMES = 216000
+
+##############################################################################
+# BOT
+##############################################################################
+
+def choose_box(simulation,rng,mistakes):
+   """
+   Returns the box the bot operates on for the next instruction.
+   """
+   
+   instruction = simulation.queue[0]
+   
+   if instruction.opcode is INSERT:
+      
+      #fewer items make for a shorter operation
+      box_sizes = [(len(simulation.box_data[box_num]),box_num)
+                   for box_num in range(1,NUM_BOXES+1)]
+      return min(box_sizes)[1]
+   
+   if rng.random() < mistakes:
+      return rng.randint(1,NUM_BOXES)
+   
+   return simulation.live_data[instruction.data]
+
+#-----------------------------------------------------------------------------
+
+def play_game(seed,mistakes,max_frames):
+   """
+   Plays one game and returns its simulation.
+   """
+   
+   simulation = Simulation(seed)
+   
+   #the bot's own choices don't touch the game's random generator
+   rng = random.Random(seed)
+   
+   while not simulation.game_over and simulation.frame < max_frames:
+      
+      if len(simulation.queue) > 0:
+         simulation.apply_action(choose_box(simulation,rng,mistakes))
+      
+      #nothing changes for the bot to act on until the next event
+      frames = min(simulation.frames_until_event(),
+                   max_frames - simulation.frame)
+      simulation.step(frames)
+   
+   return simulation
+
+##############################################################################
+# MAIN EXECUTION
+##############################################################################
+
+if __name__ == "__main__":
+   
+   parser = argparse.ArgumentParser(description="Hash (simulated games)")
+   parser.add_argument("--games",type=int,default=DEFAULT_GAMES,
+                       help="games to play (default %(default)s)")
+   parser.add_argument("--seed",type=int,default=0,
+                       help="seed of the first game, each game after it "
+                            "uses the next seed (default %(default)s)")
+   parser.add_argument("--mistakes",type=float,default=0.25,
+                       help="share of removes made from a random box "
+                            "(default %(default)s)")
+   parser.add_argument("--max-frames",type=int,default=DEFAULT_MAX_FRAMES,
+                       help="frames a game is stopped after "
+                            "(default %(default)s)")
+   args = parser.parse_args()
+   
+   scores = []
+   frames = 0
+   unfinished = 0
+   
+   start = default_timer()
+   
+   for seed in xrange(args.seed,args.seed+args.games):
+      
+      simulation = play_game(seed,args.mistakes,args.max_frames)
+      
+      scores.append(simulation.score)
+      frames += simulation.frame
+      
+      if not simulation.game_over:
+         unfinished += 1
+   
+   elapsed = default_timer() - start
+   
+   print "games: %d  seconds: %.2f  games/s: %.0f  frames/s: %.0f" % \
+         (args.games,elapsed,args.games/max(elapsed,1e-9),
+          frames/max(elapsed,1e-9))
+   print "score mean: %.1f  min: %d  max: %d  unfinished: %d" % \
+         (float(sum(scores))/max(len(scores),1),min(scores),max(scores),
+          unfinished)
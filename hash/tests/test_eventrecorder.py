@@ -0,0 +1,71 @@
+##############################################################################
+# test_eventrecorder.py
+##############################################################################
+# Checks that event logs give back the seed they were recorded with.
+#
+# Run from the hash directory with: python -m unittest discover tests
+##############################################################################
+# 10/26 - GoshDarnGames
+##############################################################################
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from lib.engine.systemevents import *
+from lib.engine.eventrecorder import *
+
+##############################################################################
+# SEEDS
+##############################################################################
+
+class SeedRoundTripTest(unittest.TestCase):
+   
+   def setUp(self):
+      self.log_dir = tempfile.mkdtemp()
+      self.log_path = os.path.join(self.log_dir,"session.rec")
+   
+   #--------------------------------------------------------------------------
+   
+   def tearDown(self):
+      shutil.rmtree(self.log_dir)
+   
+   #--------------------------------------------------------------------------
+   
+   def _round_trip(self,seed):
+      """
+      Records an empty session with seed and returns the seed the log is
+      played back with.
+      """
+      
+      recorder = EventRecorder(self.log_path,seed)
+      recorder.close()
+      SystemEventManager.unregister_listener(recorder)
+      
+      player = EventPlayer(self.log_path)
+      player.log_file.close()
+      SystemEventManager.unregister_listener(player)
+      
+      return player.seed
+   
+   #--------------------------------------------------------------------------
+   
+   def test_negative_seed(self):
+      self.assertEqual(self._round_trip(-1),-1)
+   
+   #--------------------------------------------------------------------------
+   
+   def test_seed_range(self):
+      self.assertEqual(self._round_trip(MIN_SEED),MIN_SEED)
+      self.assertEqual(self._round_trip(MAX_SEED),MAX_SEED)
+   
+   #--------------------------------------------------------------------------
+   
+   def test_seed_out_of_range(self):
+      self.assertRaises(ValueError,EventRecorder,self.log_path,MAX_SEED+1)
+      self.assertRaises(ValueError,EventRecorder,self.log_path,MIN_SEED-1)
+
+
+if __name__ == "__main__":
+   unittest.main()
@@ -0,0 +1,112 @@
+##############################################################################
+# test_surfacefactory.py
+##############################################################################
+# Checks that surfaces from the surface factory draw in the right colours
+# on a palettized display, where blitting copies palette indices.
+#
+# Run from the hash directory with: python -m unittest discover tests
+##############################################################################
+# 10/26 - GoshDarnGames
+##############################################################################
+
+import os
+import unittest
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+import pygame
+
+from lib.engine.surfacefactory import set_format_surface
+from lib.layout import Layout
+from lib.gamestate import *
+
+##############################################################################
+# 8 BIT DISPLAY
+##############################################################################
+
+class PalettizedDisplayTest(unittest.TestCase):
+   
+   def setUp(self):
+      
+      pygame.init()
+      self.screen = pygame.display.set_mode((640,480),0,8)
+      set_format_surface(self.screen)
+      
+      self.layout = Layout(self.screen.get_size())
+      
+      #the panels and arrows are cached by scale, draw them afresh
+      ProgressBar._panels.clear()
+      ErrorMessage._panels.clear()
+      InstructionQueue._arrow_sprites.clear()
+   
+   #--------------------------------------------------------------------------
+   
+   def tearDown(self):
+      
+      #pygame is left running, the font cache keeps its fonts between tests
+      set_format_surface(None)
+   
+   #--------------------------------------------------------------------------
+   
+   def _check_panel_fill(self,panel,rect,color):
+      """
+      Checks the top row of a panel, which has no text on it, is drawn the
+      same as rect filled with color directly.
+      """
+      
+      self.screen.fill((0,0,0))
+      self.screen.blit(panel,rect)
+      
+      expected = self.screen.map_rgb(color)
+      
+      for x in range(rect.left,rect.right):
+         self.assertEqual(self.screen.get_at_mapped((x,rect.top)),expected)
+   
+   #--------------------------------------------------------------------------
+   
+   def test_progress_panel(self):
+      
+      self._check_panel_fill(ProgressBar._get_panel(self.layout),
+                             self.layout.rect(PROGRESS_RECT),
+                             PROGRESS_BG_COLOR)
+   
+   #--------------------------------------------------------------------------
+   
+   def test_error_panel(self):
+      
+      self._check_panel_fill(ErrorMessage._get_panel(self.layout),
+                             self.layout.rect(ERROR_RECT),
+                             ERROR_BG_COLOR)
+   
+   #--------------------------------------------------------------------------
+   
+   def test_arrows(self):
+      
+      arrow_sprites = InstructionQueue._get_arrow_sprites(self.layout)
+      tip = self.layout.point(ARROW_TIP)
+      
+      for opcode,color,design_pointlist in \
+                           ((INSERT,(0,0,255),INSERT_ARROW_POINTS),
+                            (REMOVE,(255,0,0),REMOVE_ARROW_POINTS)):
+         
+         arrow_surf,offset = arrow_sprites[opcode]
+         
+         self.screen.fill((0,0,0))
+         self.screen.blit(arrow_surf,(tip[0]-offset[0],tip[1]-offset[1]))
+         drawn = self.screen.copy()
+         
+         #the same arrow drawn straight on the screen
+         self.screen.fill((0,0,0))
+         pointlist = [(tip[0]+x,tip[1]+y) for x,y in
+                      [self.layout.point(point) 
+                       for point in design_pointlist]]
+         rect = pygame.draw.polygon(self.screen,color,pointlist)
+         
+         for x in range(rect.left,rect.right):
+            for y in range(rect.top,rect.bottom):
+               self.assertEqual(drawn.get_at_mapped((x,y)),
+                                self.screen.get_at_mapped((x,y)))
+
+
+if __name__ == "__main__":
+   unittest.main()